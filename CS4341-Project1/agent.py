@@ -32,6 +32,17 @@ class Agent(object):
         """Returns a column between 0 and (brd.w-1). The column must be free in the board."""
         raise NotImplementedError("Please implement this method")
 
+    # Learn about the opponent's move.
+    #
+    # Called by the game after each legal move of the opponent, before this
+    # agent is asked for its move. Does nothing by default.
+    #
+    # PARAM [board.Board] brd: a copy of the board after the opponent's move
+    # PARAM [int]         col: the column the opponent played
+    def opponent_moved(self, brd, col):
+        """Called after each legal move of the opponent"""
+        pass
+
 
 
 ##########################
@@ -1,7 +1,183 @@
+import copy
 import math
+import multiprocessing
 import random
+import time
 
 import agent
+import move_ordering
+import threat_evaluator
+
+#######################
+# Transposition Table #
+#######################
+
+class TranspositionTable(object):
+    """Fixed-size table of search results keyed by Zobrist hash"""
+
+    # Bound types of the stored values
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    # Class constructor.
+    #
+    # PARAM [int] size: the number of slots in the table
+    def __init__(self, size):
+        """Class constructor"""
+        # Number of slots
+        self.size = size
+        self.clear()
+
+    # Empty the table.
+    def clear(self):
+        """Removes all the entries"""
+        # Slots, each None or (key, depth, value, flag, move, generation)
+        self.entries = [None] * self.size
+        # Incremented at each search, used to age out old entries
+        self.generation = 0
+
+    # Mark the start of a new search.
+    def new_search(self):
+        """Makes the entries stored so far replaceable"""
+        self.generation += 1
+
+    # Look up a position.
+    #
+    # PARAM [int] key: the Zobrist hash of the position
+    # RETURN [tuple]: (key, depth, value, flag, move, generation), or None
+    def get(self, key):
+        """Returns the entry for the given key, or None"""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    # Store a search result.
+    #
+    # An entry is replaced if it is for the same position, comes from an
+    # earlier search, or was searched less deeply.
+    #
+    # PARAM [int] key:   the Zobrist hash of the position
+    # PARAM [int] depth: the remaining depth the position was searched to
+    # PARAM [int] value: the value found by the search
+    # PARAM [int] flag:  EXACT, LOWER or UPPER
+    # PARAM [int] move:  the best column found, or None
+    def put(self, key, depth, value, flag, move):
+        """Stores a search result, subject to the replacement policy"""
+        slot = key % self.size
+        entry = self.entries[slot]
+        if (entry is None or entry[0] == key or
+            entry[5] != self.generation or entry[1] <= depth):
+            self.entries[slot] = (key, depth, value, flag, move, self.generation)
+
+##################
+# Search timeout #
+##################
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget of a move is used up"""
+    pass
+
+##############################
+# Parallel root search worker #
+##############################
+
+# Make a pool process's copy of the agent search on its own.
+#
+# On Linux the pool forks, so the initializer arguments aren't pickled and
+# __getstate__ doesn't run: the copy would still hold the parent's pools,
+# which it can't use, and try to search in parallel or ponder itself.
+#
+# PARAM [AlphaBetaAgent] agent: the copy of the agent in this process
+def detach_worker_agent(agent):
+    agent.pool = None
+    agent.shared_alpha = None
+    agent.workers = 1
+    agent.ponder = False
+    agent.ponder_pool = None
+    agent.pondering = None
+
+# Each pool process keeps its own copy of the searching agent (so its
+# transposition table and move ordering survive between moves) and shares the
+# best root score found so far with the other processes.
+WORKER_AGENT = None
+WORKER_ALPHA = None
+
+# Pool initializer.
+#
+# PARAM [AlphaBetaAgent]          agent: the agent to copy into this process
+# PARAM [multiprocessing.Value]   alpha: the shared best root score
+def init_root_worker(agent, alpha):
+    global WORKER_AGENT
+    global WORKER_ALPHA
+    WORKER_AGENT = agent
+    WORKER_ALPHA = alpha
+    detach_worker_agent(WORKER_AGENT)
+
+# Search one root move in a pool process.
+#
+# The move is searched with alpha just below the best score found so far by
+# any process. A value above that bound is exact, and a value at or below it
+# is strictly worse than a move already found, so the caller picks the same
+# move as the serial search.
+#
+# PARAM [tuple] task: (board, column, depth, player, principal variation to
+#                     follow, deadline as a time.perf_counter() value or None)
+# RETURN [tuple]: (column, value or None on timeout, principal variation,
+#                 search statistics)
+def search_root_move(task):
+    (brd, col, depth, player, pv, deadline) = task
+    # perf_counter() is a system-wide clock, so the deadline set by the
+    # parent holds here too; a task dequeued after it times out at once
+    if deadline is not None and time.perf_counter() >= deadline:
+        return (col, None, [], {})
+    agent = WORKER_AGENT
+    agent.player = player
+    agent.start_search(brd)
+    agent.prepare_root(brd, depth)
+    agent.pv = pv
+    agent.follow_pv = len(pv) > 0
+    agent.deadline = deadline
+    alpha = math.nextafter(WORKER_ALPHA.value, -math.inf)
+    try:
+        v = agent.child_value(brd, col, agent.min_value, alpha, float('inf'), depth - 1)
+    except SearchTimeout:
+        return (col, None, [], agent.stats)
+    finally:
+        agent.deadline = None
+    with WORKER_ALPHA.get_lock():
+        if v > WORKER_ALPHA.value:
+            WORKER_ALPHA.value = v
+    return (col, v, [col] + agent.pv_table[1], agent.stats)
+
+##################
+# Ponder worker  #
+##################
+
+# The pondering process keeps its own copy of the agent, and searches the
+# position expected after the opponent's reply while the opponent thinks.
+PONDER_AGENT = None
+
+# Pool initializer.
+#
+# PARAM [AlphaBetaAgent] agent: the agent to copy into this process
+def init_ponder_worker(agent):
+    global PONDER_AGENT
+    PONDER_AGENT = agent
+    # The copy only searches, serially; it doesn't ponder on its own
+    detach_worker_agent(PONDER_AGENT)
+
+# Search a position in the pondering process.
+#
+# PARAM [tuple] task: (board, player)
+# RETURN [tuple]: (best column, principal variation, search statistics)
+def ponder_search(task):
+    (brd, player) = task
+    agent = PONDER_AGENT
+    agent.player = player
+    move = agent.go(brd)
+    return (move, agent.pv, agent.stats)
 
 ###########################
 # Alpha-Beta Search Agent #
@@ -14,12 +190,120 @@ class AlphaBetaAgent(agent.Agent):
     #
     # PARAM [string] name:      the name of this player
     # PARAM [int]    max_depth: the maximum search depth
-    def __init__(self, name, max_depth):
+    # PARAM [bool]   in_place:  if True, search by adding and undoing tokens
+    #                           on a single board instead of copying it
+    # PARAM [int]    tt_size:   the number of transposition table slots,
+    #                           0 to disable the table
+    # PARAM [float]  time_limit:    the time limit for a move in seconds; if
+    #                               set, deepen iteratively up to max_depth
+    #                               instead of searching to max_depth directly
+    # PARAM [float]  time_fraction: the fraction of time_limit to use
+    # PARAM [move_ordering.MoveOrdering] ordering: the move ordering to use,
+    #                                              None for left to right
+    # PARAM [bool]   incremental_eval: if True, score leaves with a
+    #                                  threat_evaluator.ThreatEvaluator kept
+    #                                  up to date along the search path
+    # PARAM [int]    workers:   the number of processes searching root moves
+    #                           in parallel; 1 for a serial search
+    # PARAM [opening_book.OpeningBook] book: the book to play from while the
+    #                                        position is in it, or None
+    # PARAM [bool]   batch_eval: if True, score all the leaves below a node
+    #                            at once with a NumPy
+    #                            batch_evaluator.BatchEvaluator
+    # PARAM [bool]   ponder:    if True, search the expected next position in
+    #                           a background process while the opponent thinks
+    def __init__(self, name, max_depth, in_place=False, tt_size=0,
+                 time_limit=None, time_fraction=0.5, ordering=None,
+                 incremental_eval=False, workers=1, book=None,
+                 batch_eval=False, ponder=False):
         super().__init__(name)
         # Max search depth
         self.max_depth = max_depth
+        # Per-move time budget for iterative deepening
+        self.time_limit = time_limit
+        self.time_fraction = time_fraction
+        # Time at which the current search must stop, None for no limit
+        self.deadline = None
+        # Depth of the current root search
+        self.root_depth = max_depth
+        # Principal variation of the last completed search, and whether the
+        # current search is still on it
+        self.pv = []
+        self.follow_pv = False
+        # pv_table[ply] is the best line found from the node at that ply
+        self.pv_table = []
+        # Make/unmake search on a single board
+        self.in_place = in_place
+        # Transposition table, kept across calls to go()
+        self.tt = TranspositionTable(tt_size) if tt_size > 0 else None
+        # Game settings the table entries are valid for
+        self.tt_owner = None
+        # Move ordering
+        if ordering is None:
+            ordering = move_ordering.MoveOrdering()
+        self.ordering = ordering
+        # Incremental leaf evaluator, created for the board size in use
+        self.incremental_eval = incremental_eval
+        self.evaluator = None
+        # Batch leaf evaluator (needs NumPy), created for the board size in use
+        self.batch_eval = batch_eval
+        self.batch = None
+        # Search statistics of the last call to go(): nodes visited, cutoffs,
+        # depth of the last completed search and transposition table hits
+        self.stats = {"nodes": 0, "cutoffs": 0, "depth": 0, "tt_hits": 0}
+        # Parallel root search; the pool is created on first use and reused
+        self.workers = workers
+        self.pool = None
+        self.shared_alpha = None
+        # Opening book
+        self.book = book
+        # Pondering: the background process, created on first use, and the
+        # pending search as (hash of the expected position, async result)
+        self.ponder = ponder
+        self.ponder_pool = None
+        self.pondering = None
         self.cols = dict()
 
+    # The pool and the book can't be pickled; worker copies of the agent
+    # search serially and only see positions that are out of book.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["shared_alpha"] = None
+        state["book"] = None
+        state["workers"] = 1
+        state["ponder"] = False
+        state["ponder_pool"] = None
+        state["pondering"] = None
+        return state
+
+    # Copies (e.g. the per-match copies of the tournament engine) start
+    # without processes of their own and share the read-only book.
+    def __deepcopy__(self, memo):
+        cpy = self.__class__.__new__(self.__class__)
+        memo[id(self)] = cpy
+        for (k, v) in self.__dict__.items():
+            if k in ("pool", "shared_alpha", "ponder_pool", "pondering"):
+                v = None
+            elif k != "book":
+                v = copy.deepcopy(v, memo)
+            cpy.__dict__[k] = v
+        return cpy
+
+    # Shut down the parallel search and pondering processes, if any.
+    def close(self):
+        """Terminates the worker processes of the parallel root search and pondering"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.shared_alpha = None
+        if self.ponder_pool is not None:
+            self.ponder_pool.terminate()
+            self.ponder_pool.join()
+            self.ponder_pool = None
+            self.pondering = None
+
     # Pick a column.
     #
     # PARAM [board.Board] brd: the current board state
@@ -29,29 +313,330 @@ class AlphaBetaAgent(agent.Agent):
     def go(self, brd):
         """Search for the best move (choice of column for the token)"""
         # Your code here
+        start = time.perf_counter()
+        move = self.ponder_move(brd)
+        if move is None:
+            # Any time spent waiting for pondering comes out of the budget
+            move = self.think(brd, start)
+        if self.ponder:
+            self.start_ponder(brd, move)
+        return move
+
+    # Learn about the opponent's move.
+    #
+    # PARAM [board.Board] brd: the board state after the opponent's move
+    # PARAM [int]         col: the column the opponent played
+    def opponent_moved(self, brd, col):
+        """Drops the pondering search if the opponent didn't play the expected reply"""
+        if self.pondering is not None and self.pondering[0] != brd.hash:
+            # Ponder miss; the stale search ends on its own time budget
+            self.pondering = None
+
+    # Get the result of pondering, if it was on the right position.
+    #
+    # PARAM [board.Board] brd: the current board state
+    # RETURN [int]: the column found by pondering, or None
+    def ponder_move(self, brd):
+        if self.pondering is None:
+            return None
+        (key, result) = self.pondering
+        self.pondering = None
+        if key != brd.hash:
+            return None
+        # The pondering search started earlier with the same budget, so it
+        # is usually done already
+        timeout = None
+        if self.time_limit is not None:
+            timeout = self.time_limit * self.time_fraction
+        try:
+            (move, pv, stats) = result.get(timeout)
+        except multiprocessing.TimeoutError:
+            return None
+        if move not in brd.free_cols():
+            return None
+        self.pv = pv
+        self.stats = stats
+        return move
+
+    # Start pondering on the position expected after our move and the
+    # opponent's reply predicted by the principal variation.
+    #
+    # PARAM [board.Board] brd:  the current board state
+    # PARAM [int]         move: the column we are playing
+    def start_ponder(self, brd, move):
+        if len(self.pv) < 2 or self.pv[0] != move:
+            return
         temp = brd.copy()
+        temp.add_token(move)
+        reply = self.pv[1]
+        if temp.get_outcome() != 0 or reply not in temp.free_cols():
+            return
+        temp.add_token(reply)
+        if temp.get_outcome() != 0 or not temp.free_cols():
+            return
+        if self.ponder_pool is None:
+            self.ponder_pool = multiprocessing.Pool(1, init_ponder_worker, (self,))
+        self.pondering = (temp.hash, self.ponder_pool.apply_async(ponder_search, ((temp, self.player),)))
+
+    # Search for the best move.
+    #
+    # PARAM [board.Board] brd:   the current board state
+    # PARAM [float]       start: the time.perf_counter() value the time budget
+    #                            runs from, None for now
+    # RETURN [int]: the best column found
+    def think(self, brd, start=None):
+        """Searches brd with the configured settings; returns the best column"""
+        self.start_search(brd)
+        if self.book is not None:
+            move = self.book.lookup(brd)
+            if move is not None:
+                return move
+        self.pv = []
+        if self.time_limit is None:
+            self.deadline = None
+            return self.search_root(brd, self.max_depth)
+        # Iterative deepening
+        if start is None:
+            start = time.perf_counter()
+        budget = self.time_limit * self.time_fraction
+        # No point searching deeper than the number of empty cells
+        empty = sum(1 for row in brd.board for t in row if t == 0)
+        max_depth = min(self.max_depth, empty)
+        bestmove = None
+        for depth in range(1, max(max_depth, 1) + 1):
+            # Depth 1 always completes, so there is always a move to return
+            if depth > 1:
+                if time.perf_counter() - start >= budget:
+                    break
+                self.deadline = start + budget
+            try:
+                bestmove = self.search_root(brd, depth)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+        return bestmove
+
+    # Set up the search state for a new move.
+    #
+    # PARAM [board.Board] brd: the current board state
+    def start_search(self, brd):
+        if self.tt is not None:
+            # Values depend on the game settings and on who we are playing
+            owner = (brd.w, brd.h, brd.n, self.player)
+            if owner != self.tt_owner:
+                self.tt.clear()
+                self.tt_owner = owner
+            self.tt.new_search()
+        self.ordering.new_search()
+        self.stats = {"nodes": 0, "cutoffs": 0, "depth": 0, "tt_hits": 0}
+
+    # Set up the search state for a search of the given depth.
+    #
+    # PARAM [board.Board] brd:   the current board state
+    # PARAM [int]         depth: the search depth
+    def prepare_root(self, brd, depth):
+        self.root_depth = depth
+        self.pv_table = [[] for i in range(depth + 1)]
+        if self.incremental_eval:
+            ev = self.evaluator
+            if ev is None or (ev.w, ev.h, ev.n) != (brd.w, brd.h, brd.n):
+                self.evaluator = threat_evaluator.ThreatEvaluator(brd.w, brd.h, brd.n)
+            self.evaluator.load(brd)
+        if self.batch_eval:
+            # NumPy is only needed by agents that use it
+            import batch_evaluator
+            ev = self.batch
+            if ev is None or (ev.w, ev.h, ev.n) != (brd.w, brd.h, brd.n):
+                self.batch = batch_evaluator.BatchEvaluator(brd.w, brd.h, brd.n)
+
+    # Score every child of a node one ply above the leaves in one batch.
+    #
+    # PARAM [board.Board] board: the board state
+    # PARAM [list of int] cols:  the columns to play
+    # RETURN [list of int]: the utility of each child, in cols order
+    def batch_values(self, board, cols):
+        self.stats["nodes"] += len(cols)
+        # The leaves have no principal variation below them
+        self.pv_table[self.root_depth] = []
+        children = self.batch.children(board.board, cols, board.player)
+        return self.batch.score(children, self.player)
+
+    # Search the root moves in the worker pool.
+    #
+    # PARAM [board.Board] brd:   the current board state
+    # PARAM [list of int] cols:  the root columns, in search order
+    # PARAM [int]         depth: the search depth
+    # RETURN [list of (int, float, list of int)]: (column, value, principal
+    #                                             variation) in cols order
+    def parallel_root(self, brd, cols, depth):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.pool = multiprocessing.Pool(self.workers, init_root_worker,
+                                             (self, self.shared_alpha))
+        self.shared_alpha.value = float('-inf')
+        tasks = []
+        for col in cols:
+            pv = self.pv if (self.pv and self.pv[0] == col) else []
+            tasks.append((brd, col, depth, self.player, pv, self.deadline))
+        results = []
+        timeout = False
+        # Results come back in task order; wait for all of them so no stale
+        # task is left running in the pool
+        for (col, v, pv, stats) in self.pool.imap(search_root_move, tasks, 1):
+            for k in stats:
+                if k != "depth":
+                    self.stats[k] = self.stats.get(k, 0) + stats[k]
+            if v is None:
+                timeout = True
+            results.append((col, v, pv))
+        if timeout:
+            raise SearchTimeout()
+        return results
+
+    # Search the given board to a fixed depth.
+    #
+    # PARAM [board.Board] brd:   the current board state
+    # PARAM [int]         depth: the search depth
+    # RETURN [int]: the best column found
+    def search_root(self, brd, depth):
+        """Searches brd to the given depth; returns the best column"""
+        self.prepare_root(brd, depth)
+        # Search the previous principal variation first
+        self.follow_pv = len(self.pv) > 0
+        cols = self.ordering.order(brd, brd.free_cols(), 0)
+        if self.follow_pv:
+            self.order_pv(0, cols)
         highscore = float('-inf')
         bestmove = -1
-        for col in brd.free_cols():
-            temp = brd.copy()
-            temp.add_token(col)
-            score = self.min_value(temp, float('-inf'), float('inf'), self.max_depth - 1)
+        if self.workers > 1:
+            for (col, score, pv) in self.parallel_root(brd, cols, depth):
+                if score > highscore:
+                    highscore = score
+                    bestmove = col
+                    self.pv_table[0] = pv
+            cols = []
+        # In-place search uses this as its one private board
+        temp = brd.copy()
+        for col in cols:
+            # Moves that can't beat the best so far only need an upper bound
+            score = self.child_value(temp, col, self.min_value, highscore, float('inf'), depth - 1)
+            self.follow_pv = False
             #print('score for col ' + str(col) + ': ' + str(score))
             if score > highscore:
                 highscore = score
                 bestmove = col
+                self.pv_table[0] = [col] + self.pv_table[1]
+        self.pv = self.pv_table[0]
+        self.stats["depth"] = depth
 
         if bestmove == -1:
              return random.choice(brd.free_cols())
+        if self.tt is not None:
+            self.tt.put(brd.hash, depth, highscore, TranspositionTable.EXACT, bestmove)
         return bestmove
 
+    # Called on entering a search node.
+    #
+    # PARAM [int] depth: the remaining depth of the node
+    # RETURN [int]: the ply of the node, counted from the root
+    def enter_node(self, depth):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        self.stats["nodes"] += 1
+        ply = self.root_depth - depth
+        self.pv_table[ply] = []
+        return ply
+
+    # Move the principal variation move for a ply to the front.
+    #
+    # PARAM [int]         ply:  the ply of the node
+    # PARAM [list of int] cols: the legal columns, reordered in place
+    def order_pv(self, ply, cols):
+        if ply < len(self.pv) and self.pv[ply] in cols:
+            cols.remove(self.pv[ply])
+            cols.insert(0, self.pv[ply])
+        else:
+            self.follow_pv = False
+
+    # Calculate the value of the board after a token is added.
+    #
+    # PARAM [board.Board] board:    the board state
+    # PARAM [int]         col:      the column where the token is added
+    # PARAM [function]    value_fn: self.min_value or self.max_value
+    # PARAM [float]       alpha:    the alpha bound
+    # PARAM [float]       beta:     the beta bound
+    # PARAM [int]         depth:    the remaining depth for the child
+    # RETURN [float]: the value of the child board
+    def child_value(self, board, col, value_fn, alpha, beta, depth):
+        temp = board if self.in_place else board.copy()
+        player = temp.player
+        temp.add_token(col)
+        if self.evaluator is not None:
+            (x, y) = temp.last_move
+            self.evaluator.add(x, y, player)
+        v = value_fn(temp, alpha, beta, depth)
+        if self.evaluator is not None:
+            self.evaluator.remove(x, y, player)
+        if self.in_place:
+            temp.undo_token()
+        return v
+
+    # Look up a board in the transposition table.
+    #
+    # PARAM [board.Board]  board: the board state
+    # PARAM [float]        alpha: the alpha bound
+    # PARAM [float]        beta:  the beta bound
+    # PARAM [int]          depth: the remaining depth
+    # PARAM [list of int]  cols:  the legal columns; the stored best move,
+    #                             if any, is moved to the front
+    # RETURN [(float, float, float)]: (value, alpha, beta), where value is
+    #                                 None unless the stored entry settles
+    #                                 the search, and alpha and beta are
+    #                                 narrowed by the stored bound
+    def tt_probe(self, board, alpha, beta, depth, cols):
+        entry = self.tt.get(board.hash)
+        if entry is None:
+            return (None, alpha, beta)
+        self.stats["tt_hits"] += 1
+        (key, edepth, value, flag, move, gen) = entry
+        if move in cols:
+            cols.remove(move)
+            cols.insert(0, move)
+        if edepth >= depth:
+            if flag == TranspositionTable.EXACT:
+                return (value, alpha, beta)
+            if flag == TranspositionTable.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return (value, alpha, beta)
+        return (None, alpha, beta)
+
+    # Store a search result in the transposition table.
+    #
+    # PARAM [board.Board] board: the board state
+    # PARAM [float]       v:     the value found
+    # PARAM [float]       alpha: the alpha bound the search was run with
+    # PARAM [float]       beta:  the beta bound the search was run with
+    # PARAM [int]         depth: the remaining depth
+    # PARAM [int]         move:  the best column found
+    def tt_store(self, board, v, alpha, beta, depth, move):
+        if v <= alpha:
+            flag = TranspositionTable.UPPER
+        elif v >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.tt.put(board.hash, depth, v, flag, move)
+
     def terminal_test(self, board, depth):
         return depth == 0 or len(board.free_cols()) == 0 or board.get_outcome() != 0
 
     def utility(self, board):
         playerScore = 0
         opponentScore = 0
-        successors = self.get_successors(board)
 
         if board.get_outcome() != 0 and board.get_outcome() != self.player:
             return -1000000
@@ -59,6 +644,13 @@ class AlphaBetaAgent(agent.Agent):
         if board.get_outcome() == self.player:
             return 1000000
 
+        if self.evaluator is not None:
+            return self.evaluator.score(self.player)
+
+        if self.in_place:
+            return self.threat_score_in_place(board)
+
+        successors = self.get_successors(board)
         for i in range(2, board.n + 1):
 
             player_new_threats = self.count_new_threats(successors, self.player, i)
@@ -69,6 +661,31 @@ class AlphaBetaAgent(agent.Agent):
 
         return playerScore - opponentScore
 
+    # Same score as the successor-based part of utility(), but computed by
+    # adding and undoing tokens on the given board instead of copying it.
+    #
+    # PARAM [board.Board] board: the board state (left unchanged)
+    # RETURN [float]: the player's threat score minus the opponent's
+    def threat_score_in_place(self, board):
+        playerScore = 0
+        opponentScore = 0
+        opponent = 1 if self.player == 2 else 2
+        player = board.player
+        # Successors are built with the player who just moved (see get_successors)
+        board.player = 2 if player == 1 else 1
+        for col in board.free_cols():
+            board.add_token(col)
+            y = 0
+            while board.board[y][col] != 0 and y < board.h - 1:
+                y = y + 1
+            for i in range(2, board.n + 1):
+                playerScore += self.count_n(board, self.player, i, col, y-1) * math.pow(10, i)
+                opponentScore += self.count_n(board, opponent, i, col, y-1) * math.pow(10, i)
+            # undo_token() also restores the swapped player for the next column
+            board.undo_token()
+        board.player = player
+        return playerScore - opponentScore
+
     def count_new_threats(self, succ_boards, piece, n):
         threats = 0;
         for (board, col_index) in succ_boards:
@@ -98,29 +715,77 @@ class AlphaBetaAgent(agent.Agent):
         return 1
 
     def min_value(self, board, alpha, beta, depth):
+        ply = self.enter_node(depth)
         if self.terminal_test(board, depth):
             return self.utility(board)
+        cols = self.ordering.order(board, board.free_cols(), ply)
+        if self.tt is not None:
+            (value, alpha, beta) = self.tt_probe(board, alpha, beta, depth, cols)
+            if value is not None:
+                return value
+        if self.follow_pv:
+            self.order_pv(ply, cols)
+        alpha0 = alpha
+        beta0 = beta
         v = float('inf')
-        for col in board.free_cols():
-            temp = board.copy()
-            temp.add_token(col)
-            v = min(v, self.max_value(temp, alpha, beta, depth - 1))
+        best = None
+        values = None
+        if self.batch is not None and depth == 1:
+            values = self.batch_values(board, cols)
+        for (i, col) in enumerate(cols):
+            if values is None:
+                cv = self.child_value(board, col, self.max_value, alpha, beta, depth - 1)
+            else:
+                cv = values[i]
+            self.follow_pv = False
+            if cv < v:
+                v = cv
+                best = col
+                self.pv_table[ply] = [col] + self.pv_table[ply + 1]
             if v <= alpha:
-                return v
+                self.stats["cutoffs"] += 1
+                self.ordering.cutoff(board, col, ply, depth)
+                break
             beta = min(beta, v)
+        if self.tt is not None:
+            self.tt_store(board, v, alpha0, beta0, depth, best)
         return v
 
     def max_value(self, board, alpha, beta, depth):
+        ply = self.enter_node(depth)
         if self.terminal_test(board, depth):
             return self.utility(board)
+        cols = self.ordering.order(board, board.free_cols(), ply)
+        if self.tt is not None:
+            (value, alpha, beta) = self.tt_probe(board, alpha, beta, depth, cols)
+            if value is not None:
+                return value
+        if self.follow_pv:
+            self.order_pv(ply, cols)
+        alpha0 = alpha
+        beta0 = beta
         v = float('-inf')
-        for col in board.free_cols():
-            temp = board.copy()
-            temp.add_token(col)
-            v = max(v, self.min_value(temp, alpha, beta, depth - 1))
+        best = None
+        values = None
+        if self.batch is not None and depth == 1:
+            values = self.batch_values(board, cols)
+        for (i, col) in enumerate(cols):
+            if values is None:
+                cv = self.child_value(board, col, self.min_value, alpha, beta, depth - 1)
+            else:
+                cv = values[i]
+            self.follow_pv = False
+            if cv > v:
+                v = cv
+                best = col
+                self.pv_table[ply] = [col] + self.pv_table[ply + 1]
             if v >= beta:
-                return v
+                self.stats["cutoffs"] += 1
+                self.ordering.cutoff(board, col, ply, depth)
+                break
             alpha = max(alpha, v)
+        if self.tt is not None:
+            self.tt_store(board, v, alpha0, beta0, depth, best)
         return v
 
     # Get the successors of the given board.
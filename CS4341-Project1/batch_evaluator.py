@@ -0,0 +1,77 @@
+import numpy as np
+
+##############################
+# Vectorized Leaf Evaluation #
+##############################
+
+class BatchEvaluator(object):
+    """Scores many positions at once with NumPy sliding-window sums"""
+
+    # Positions are flat int8 arrays of length w*h, index y*w + x, holding 0,
+    # 1 or 2 like Board.board. The scores match
+    # threat_evaluator.ThreatEvaluator: a window of n cells holding k >= 2
+    # tokens of a single player and none of the other is worth 10^k to that
+    # player, and a complete window is a win.
+
+    # Class constructor.
+    #
+    # PARAM [int] w: the board width
+    # PARAM [int] h: the board height
+    # PARAM [int] n: the number of tokens to line up to win
+    def __init__(self, w, h, n):
+        """Class constructor"""
+        self.w = w
+        self.h = h
+        self.n = n
+        # Value of a window by number of tokens in it
+        self.weights = np.array([10 ** k if k >= 2 else 0 for k in range(n + 1)], dtype=np.int64)
+        # Flat cell indices of every window, one row per window
+        windows = []
+        for (dx, dy) in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            for x in range(w):
+                for y in range(h):
+                    ex = x + (n - 1) * dx
+                    ey = y + (n - 1) * dy
+                    if ex >= w or ey < 0 or ey >= h:
+                        continue
+                    windows.append([(y + i*dy) * w + x + i*dx for i in range(n)])
+        self.windows = np.array(windows, dtype=np.intp).reshape(len(windows), n)
+
+    # Build the positions reached by adding one token to a position.
+    #
+    # PARAM [2D list of int] grid:   the board configuration, row-major
+    # PARAM [list of int]    cols:   the (non-full) columns to play
+    # PARAM [int]            player: the player adding the token
+    # RETURN [numpy.ndarray]: one flat position per column, shape (len(cols), w*h)
+    def children(self, grid, cols, player):
+        """Returns the positions after player adds a token in each of cols"""
+        base = np.array(grid, dtype=np.int8).reshape(self.h * self.w)
+        # Tokens are stacked from the bottom, so the first free row of a
+        # column is the number of tokens in it
+        heights = np.count_nonzero(base.reshape(self.h, self.w), axis=0)
+        cols = np.array(cols, dtype=np.intp)
+        batch = np.repeat(base[np.newaxis, :], len(cols), axis=0)
+        batch[np.arange(len(cols)), heights[cols] * self.w + cols] = player
+        return batch
+
+    # Score a batch of positions.
+    #
+    # PARAM [numpy.ndarray] batch:  flat positions, shape (B, w*h)
+    # PARAM [int]           player: the player the scores are for
+    # RETURN [list of int]: for each position, 1000000 if player has won,
+    #                       -1000000 if the opponent has won, otherwise the
+    #                       threat score of player minus the opponent's
+    def score(self, batch, player):
+        """Returns the score of each position for the given player"""
+        opponent = 2 if player == 1 else 1
+        # (B, windows, n) cells of every window, then tokens per window
+        cells = batch[:, self.windows]
+        mine = np.count_nonzero(cells == player, axis=2)
+        theirs = np.count_nonzero(cells == opponent, axis=2)
+        # Only windows held by a single player count
+        my_score = np.where(theirs == 0, self.weights[mine], 0).sum(axis=1)
+        their_score = np.where(mine == 0, self.weights[theirs], 0).sum(axis=1)
+        values = my_score - their_score
+        values = np.where((theirs == self.n).any(axis=1), -1000000, values)
+        values = np.where((mine == self.n).any(axis=1), 1000000, values)
+        return values.tolist()
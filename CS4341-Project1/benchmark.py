@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import board
+import move_ordering
+import alpha_beta_agent as aba
+
+##############
+# Benchmarks #
+##############
+
+# Board sizes: (w, h, n)
+CONFIGS = [(7, 6, 4), (10, 8, 5), (5, 4, 3)]
+# Game phases: fraction of the cells filled
+PHASES = [("opening", 0.1), ("midgame", 0.5), ("nearfull", 0.85)]
+# Search agents: name -> (constructor arguments, depth)
+AGENTS = {
+    "default": (dict(), 4),
+    "fast": (dict(in_place=True, tt_size=1 << 16, incremental_eval=True), 6),
+}
+# A result this much slower than the baseline is a regression
+TOLERANCE = 1.10
+# Searches faster than this (in seconds) are too noisy to compare
+MIN_TIME = 0.005
+
+# Build a position.
+#
+# Positions come from a private generator with a fixed seed, so they are the
+# same in every run. Moves that would end the game are avoided.
+#
+# PARAM [class] cls:   board.Board or board.BitBoard
+# PARAM [int]   w:     the board width
+# PARAM [int]   h:     the board height
+# PARAM [int]   n:     the number of tokens to line up to win
+# PARAM [float] fill:  the fraction of the cells to fill
+# RETURN [board.Board]: the position
+def make_position(cls, w, h, n, fill):
+    """Returns a reproducible unfinished position with about fill*w*h tokens"""
+    rng = random.Random("{}x{}x{}/{}".format(w, h, n, fill))
+    brd = cls([[0] * w for i in range(h)], w, h, n)
+    for i in range(int(fill * w * h)):
+        cols = brd.free_cols()
+        rng.shuffle(cols)
+        for col in cols:
+            brd.add_token(col)
+            if brd.get_outcome() == 0:
+                break
+            brd.undo_token()
+        else:
+            break
+    # Forget the move history, like a board handed to an agent by Game, but
+    # keep the side to move
+    pos = cls(brd.board, w, h, n)
+    pos.player = brd.player
+    return pos
+
+# Time a function.
+#
+# PARAM [function] fn:     the function to time, called without arguments
+# PARAM [float]    budget: the approximate number of seconds to spend
+# RETURN [float]: the best time per call over several repetitions, in seconds
+def time_per_call(fn, budget=0.2):
+    """Returns the fastest time per call of fn"""
+    # Find a number of calls that takes a measurable time
+    calls = 1
+    while True:
+        st = time.perf_counter()
+        for i in range(calls):
+            fn()
+        et = time.perf_counter() - st
+        if et > budget / 10:
+            break
+        calls *= 2
+    best = et / calls
+    for r in range(4):
+        st = time.perf_counter()
+        for i in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - st) / calls)
+    return best
+
+# Benchmark the board primitives.
+#
+# PARAM [board.Board] brd: the position
+# RETURN [dict]: operation -> seconds per call
+def bench_board(brd):
+    """Returns the time per call of the board primitives on brd"""
+    col = brd.free_cols()[0]
+
+    def cold_outcome():
+        # Force the full scan that a board without a cached outcome does
+        brd.outcome = None
+        return brd.get_outcome()
+
+    def add_undo():
+        brd.add_token(col)
+        brd.undo_token()
+
+    results = {
+        "copy": time_per_call(brd.copy),
+        "free_cols": time_per_call(brd.free_cols),
+        "get_outcome": time_per_call(brd.get_outcome),
+        "get_outcome_cold": time_per_call(cold_outcome),
+        "add_undo_token": time_per_call(add_undo),
+    }
+    brd.get_outcome()
+    return results
+
+# Benchmark a search.
+#
+# PARAM [board.Board] brd:     the position
+# PARAM [dict]        args:    the AlphaBetaAgent constructor arguments
+# PARAM [int]         depth:   the search depth
+# PARAM [int]         repeats: the number of timed searches, each by a fresh agent
+# RETURN [dict]: "time" (best time to depth, s), "nodes", "nps" (nodes per
+#                second) and "bytes_per_node" (peak traced memory per node)
+def bench_search(brd, args, depth, repeats=3):
+    """Returns the cost of a fixed-depth search of brd"""
+    et = float('inf')
+    for r in range(repeats):
+        agent = new_agent(brd, args, depth)
+        st = time.perf_counter()
+        agent.go(brd.copy())
+        et = min(et, time.perf_counter() - st)
+    nodes = max(agent.stats["nodes"], 1)
+    # One more run, traced, for memory only (tracing distorts the time)
+    agent = new_agent(brd, args, depth)
+    tracemalloc.start()
+    agent.go(brd.copy())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time": et, "nodes": nodes, "nps": nodes / et, "bytes_per_node": peak / nodes}
+
+# Build an agent ready to search a position.
+#
+# PARAM [board.Board] brd:   the position
+# PARAM [dict]        args:  the AlphaBetaAgent constructor arguments
+# PARAM [int]         depth: the search depth
+# RETURN [alpha_beta_agent.AlphaBetaAgent]: the agent
+def new_agent(brd, args, depth):
+    """Returns a fresh agent set up to play brd"""
+    random.seed(0)
+    agent = aba.AlphaBetaAgent("bench", depth, ordering=move_ordering.KillerHistoryOrdering(), **args)
+    agent.player = brd.player
+    # Allocate the transposition table now, so it doesn't count as search memory
+    agent.start_search(brd)
+    return agent
+
+# Run all the benchmarks.
+#
+# RETURN [dict]: benchmark name -> dict of measures
+def run_all():
+    """Runs all the benchmarks and returns the results"""
+    results = {}
+    for (w, h, n) in CONFIGS:
+        for (phase, fill) in PHASES:
+            for cls in (board.Board, board.BitBoard):
+                brd = make_position(cls, w, h, n, fill)
+                name = "board/{}/{}x{}x{}/{}".format(cls.__name__, w, h, n, phase)
+                results[name] = bench_board(brd)
+                print(name, " ".join("{}={:.2e}".format(k, v) for (k, v) in results[name].items()))
+            brd = make_position(board.Board, w, h, n, fill)
+            for (aname, (args, depth)) in AGENTS.items():
+                name = "search/{}/{}x{}x{}/{}/d{}".format(aname, w, h, n, phase, depth)
+                results[name] = bench_search(brd, args, depth)
+                r = results[name]
+                print(name, "time={:.3f}s nodes={} nps={:.0f} bytes/node={:.0f}".format(r["time"], r["nodes"], r["nps"], r["bytes_per_node"]))
+    return results
+
+# Compare results against a baseline.
+#
+# Times are compared per call (board) or to depth (search); node counts
+# must not grow either, since they measure pruning.
+#
+# PARAM [dict]  results:   the new results
+# PARAM [dict]  baseline:  the baseline results
+# PARAM [float] tolerance: the slowdown ratio above which a result regressed
+# RETURN [list of string]: a description of each regression
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Returns the regressions of results with respect to baseline"""
+    regressions = []
+    for (name, measures) in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for (k, v) in measures.items():
+            # Higher is better for nodes per second, lower for the rest
+            if k == "nps":
+                continue
+            old = baseline[name].get(k)
+            if k == "time" and name.startswith("search/") and old is not None and old < MIN_TIME:
+                continue
+            if old and v > old * tolerance:
+                regressions.append("{} {}: {:.3g} -> {:.3g} ({:+.0f}%)".format(name, k, old, v, 100 * (v / old - 1)))
+    return regressions
+
+if __name__ == "__main__":
+    if not len(sys.argv) in [2,3,4]:
+        print("Usage:\n  {} <results json> [baseline json] [tolerance]".format(sys.argv[0]))
+        sys.exit(1)
+    results = run_all()
+    with open(sys.argv[1], "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    if len(sys.argv) >= 3:
+        tolerance = float(sys.argv[3]) if len(sys.argv) == 4 else TOLERANCE
+        with open(sys.argv[2]) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
@@ -1,4 +1,45 @@
 import copy
+import random
+
+###################
+# Zobrist hashing #
+###################
+
+# Zobrist keys, one table per board size
+ZOBRIST_KEYS = {}
+
+# Get the Zobrist keys for a board size.
+#
+# The keys come from a private, fixed-seed generator, so they are the same in
+# every process and don't disturb the global random state.
+#
+# PARAM [int] w: the board width
+# PARAM [int] h: the board height
+# RETURN [list of list of int]: keys[p][x * h + y] is the key of a token of
+#                               player p at (x,y); keys[0] is unused
+def zobrist_keys(w, h):
+    """Returns the Zobrist keys for a w x h board"""
+    if (w, h) not in ZOBRIST_KEYS:
+        rng = random.Random(4341)
+        ZOBRIST_KEYS[(w, h)] = [None] + [[rng.getrandbits(64) for i in range(w * h)]
+                                         for p in (1, 2)]
+    return ZOBRIST_KEYS[(w, h)]
+
+# Calculate the Zobrist hash of a row-major grid from scratch.
+#
+# PARAM [2D list of int] board: the board configuration, row-major
+# PARAM [int]            w:     the board width
+# PARAM [int]            h:     the board height
+# RETURN [int]: the 64-bit hash of the tokens on the board
+def zobrist_hash(board, w, h):
+    """Returns the Zobrist hash of the given grid"""
+    keys = zobrist_keys(w, h)
+    hsh = 0
+    for y in range(h):
+        for x in range(w):
+            if board[y][x] != 0:
+                hsh ^= keys[board[y][x]][x * h + y]
+    return hsh
 
 ##############
 # Game Board #
@@ -24,14 +65,33 @@ class Board(object):
         self.n = n
         # Current player
         self.player = 1
+        # Cell (x,y) of the last token added, None if unknown
+        self.last_move = None
+        # Cached game outcome, None if it must be recomputed from scratch
+        self.outcome = None
+        # Stack of (x, y, player, previous outcome) for each token added
+        self.moves = []
+        # Zobrist keys and hash of the tokens, kept up to date by add_token()
+        self.keys = zobrist_keys(w, h)
+        self.hash = zobrist_hash(board, w, h)
 
     # Clone a board.
     #
     # RETURN [board.Board]: a deep copy of this object
     def copy(self):
         """Returns a copy of this board that can be independently modified"""
-        cpy = Board(copy.deepcopy(self.board), self.w, self.h, self.n)
+        # Fill in the fields directly; the constructor would rehash the grid
+        cpy = Board.__new__(Board)
+        cpy.board = copy.deepcopy(self.board)
+        cpy.w = self.w
+        cpy.h = self.h
+        cpy.n = self.n
+        cpy.keys = self.keys
         cpy.player = self.player
+        cpy.last_move = self.last_move
+        cpy.outcome = self.outcome
+        cpy.moves = self.moves[:]
+        cpy.hash = self.hash
         return cpy
 
     # Check if a line of identical tokens exists starting at (x,y) in direction (dx,dy)
@@ -67,16 +127,52 @@ class Board(object):
                 self.is_line_at(x, y, 1, 1) or # Diagonal up
                 self.is_line_at(x, y, 1, -1)) # Diagonal down
 
+    # Check if a line of n identical tokens passes through (x,y)
+    #
+    # Only the 4 lines through (x,y) are walked, so this is O(n).
+    #
+    # PARAM [int] x:  the x coordinate of the cell
+    # PARAM [int] y:  the y coordinate of the cell
+    # RETURN [Bool]: True if n tokens of the same type have been found, False otherwise
+    def is_line_through(self, x, y):
+        """Return True if a line of n identical tokens passes through (x,y)"""
+        t = self.board[y][x]
+        if t == 0:
+            return False
+        for (dx, dy) in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            count = 1
+            # Walk forward, then backward
+            for s in (1, -1):
+                i = 1
+                while count < self.n:
+                    cx = x + s*i*dx
+                    cy = y + s*i*dy
+                    if (cx < 0 or cx >= self.w or cy < 0 or cy >= self.h or
+                        self.board[cy][cx] != t):
+                        break
+                    count = count + 1
+                    i = i + 1
+            if count >= self.n:
+                return True
+        return False
+
     # Calculate the game outcome.
     #
+    # The outcome is cached and kept up to date by add_token(), so repeated
+    # calls on an unchanged board are free. A full scan only happens when the
+    # cache is unknown (e.g., a board built from an arbitrary grid).
+    #
     # RETURN [int]: 1 for Player 1, 2 for Player 2, and 0 for no winner
     def get_outcome(self):
         """Returns the winner of the game: 1 for Player 1, 2 for Player 2, and 0 for no winner"""
-        for x in range(self.w):
-            for y in range(self.h):
-                if (self.board[y][x] != 0) and self.is_any_line_at(x,y):
-                    return self.board[y][x]
-        return 0
+        if self.outcome is None:
+            self.outcome = 0
+            for x in range(self.w):
+                for y in range(self.h):
+                    if (self.board[y][x] != 0) and self.is_any_line_at(x,y):
+                        self.outcome = self.board[y][x]
+                        return self.outcome
+        return self.outcome
 
     # Adds a token for the current player at the given column
     #
@@ -90,12 +186,36 @@ class Board(object):
         while self.board[y][x] != 0:
             y = y + 1
         self.board[y][x] = self.player
+        self.hash ^= self.keys[self.player][x * self.h + y]
+        self.moves.append((x, y, self.player, self.outcome))
+        self.last_move = (x, y)
+        # Update the cached outcome looking only at the new token
+        if self.outcome == 0 and self.is_line_through(x, y):
+            self.outcome = self.player
         # Switch player
         if self.player == 1:
             self.player = 2
         else:
             self.player = 1
 
+    # Removes the last token added with add_token()
+    #
+    # RETURN [int]: the column the token was removed from
+    #
+    # NOTE: This method restores the current player and the cached outcome.
+    def undo_token(self):
+        """Removes the last token added; returns its column"""
+        (x, y, player, outcome) = self.moves.pop()
+        self.board[y][x] = 0
+        self.hash ^= self.keys[player][x * self.h + y]
+        self.player = player
+        self.outcome = outcome
+        if self.moves:
+            self.last_move = self.moves[-1][:2]
+        else:
+            self.last_move = None
+        return x
+
     # Returns a list of the columns with at least one free slot.
     #
     # RETURN [list of int]: the columns with at least one free slot
@@ -119,3 +239,300 @@ class Board(object):
         for i in range(self.w):
             print(i, end='')
         print("")
+
+
+
+###################
+# Bitboard Board  #
+###################
+
+class BitBoardRow(list):
+    """Row of the BitBoard.board view; writing a cell updates the bitmasks"""
+
+    __slots__ = ('owner', 'y')
+
+    # Class constructor.
+    #
+    # PARAM [board.BitBoard] owner: the board the row belongs to
+    # PARAM [int]            y:     the y coordinate of the row
+    # PARAM [list of int]    cells: the tokens in the row
+    def __init__(self, owner, y, cells):
+        """Class constructor"""
+        super().__init__(cells)
+        self.owner = owner
+        self.y = y
+
+    def __setitem__(self, x, t):
+        self.owner.set_cell(x, self.y, t)
+
+    # Copies of a row are plain lists, detached from the board
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return list(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+class BitBoard(Board):
+    """Board backed by one integer bitmask per player plus column heights"""
+
+    # Bit layout: column-major, with h+1 bits per column. The extra bit on top
+    # of each column is a sentinel that is never set, so that horizontal and
+    # diagonal shifts cannot wrap from one column into the next.
+
+    # Class constructor.
+    #
+    # PARAM [2D list of int] board: the board configuration, row-major
+    # PARAM [int]            w:     the board width
+    # PARAM [int]            h:     the board height
+    # PARAM [int]            n:     the number of tokens to line up to win
+    def __init__(self, board, w, h, n):
+        """Class constructor"""
+        # Board width
+        self.w = w
+        # Board height
+        self.h = h
+        # How many tokens in a row to win
+        self.n = n
+        # Current player
+        self.player = 1
+        # Load the grid into the bitmasks
+        self.board = board
+        # Cell (x,y) of the last token added, None if unknown
+        self.last_move = None
+
+    # Row-major view of the board.
+    #
+    # The view is built on first access and then kept up to date by
+    # add_token() and undo_token(), so reading a cell costs the same as with
+    # Board. Writing a cell goes through set_cell().
+    #
+    # RETURN [2D list of int]: the board configuration, row-major
+    @property
+    def board(self):
+        """Returns the board configuration as a row-major list of lists"""
+        if self.grid is None:
+            self.grid = [BitBoardRow(self, y, [self.cell(x, y) for x in range(self.w)])
+                         for y in range(self.h)]
+        return self.grid
+
+    # Load a row-major grid into the bitmasks.
+    #
+    # PARAM [2D list of int] board: the board configuration, row-major
+    @board.setter
+    def board(self, board):
+        """Sets the board configuration from a row-major list of lists"""
+        # Bitmasks for Player 1 and Player 2 (index 0 is unused)
+        self.masks = [0, 0, 0]
+        # Number of tokens in each column
+        self.heights = [0] * self.w
+        for x in range(self.w):
+            for y in range(self.h):
+                t = board[y][x]
+                if t != 0:
+                    self.masks[t] |= 1 << (x * (self.h + 1) + y)
+                    self.heights[x] = y + 1
+        # Cached game outcome, None if it must be recomputed from scratch
+        self.outcome = None
+        # Stack of (x, y, player, previous outcome) for each token added
+        self.moves = []
+        # Zobrist keys and hash of the tokens, kept up to date by add_token()
+        self.keys = zobrist_keys(self.w, self.h)
+        self.hash = zobrist_hash(board, self.w, self.h)
+        # Row-major view, None until it is first read
+        self.grid = None
+
+    # Pickled and deep-copied boards rebuild their own view if it is read.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["grid"] = None
+        return state
+
+    # Clone a board.
+    #
+    # RETURN [board.BitBoard]: a copy of this object
+    def copy(self):
+        """Returns a copy of this board that can be independently modified"""
+        cpy = BitBoard.__new__(BitBoard)
+        cpy.w = self.w
+        cpy.h = self.h
+        cpy.n = self.n
+        cpy.player = self.player
+        cpy.keys = self.keys
+        cpy.masks = self.masks[:]
+        cpy.heights = self.heights[:]
+        cpy.last_move = self.last_move
+        cpy.outcome = self.outcome
+        cpy.moves = self.moves[:]
+        cpy.hash = self.hash
+        # The copy builds its own view if it is read
+        cpy.grid = None
+        return cpy
+
+    # Get the token at (x,y)
+    #
+    # PARAM [int] x: the x coordinate of the cell
+    # PARAM [int] y: the y coordinate of the cell
+    # RETURN [int]: 1 for Player 1, 2 for Player 2, and 0 for an empty cell
+    def cell(self, x, y):
+        """Returns the token at (x,y)"""
+        bit = 1 << (x * (self.h + 1) + y)
+        if self.masks[1] & bit:
+            return 1
+        if self.masks[2] & bit:
+            return 2
+        return 0
+
+    # Set the token at (x,y), as writing into Board.board does.
+    #
+    # The current player and the move stack are left alone.
+    #
+    # PARAM [int] x: the x coordinate of the cell
+    # PARAM [int] y: the y coordinate of the cell
+    # PARAM [int] t: 1 for Player 1, 2 for Player 2, and 0 for an empty cell
+    def set_cell(self, x, y, t):
+        """Sets the token at (x,y)"""
+        old = self.cell(x, y)
+        if old == t:
+            return
+        bit = 1 << (x * (self.h + 1) + y)
+        if old != 0:
+            self.masks[old] &= ~bit
+            self.hash ^= self.keys[old][x * self.h + y]
+        if t != 0:
+            self.masks[t] |= bit
+            self.hash ^= self.keys[t][x * self.h + y]
+        if self.grid is not None:
+            list.__setitem__(self.grid[y], x, t)
+        # The column height is one above its highest token
+        height = 0
+        for yy in range(self.h):
+            if self.cell(x, yy) != 0:
+                height = yy + 1
+        self.heights[x] = height
+        self.outcome = None
+
+    # Check if a line of identical tokens exists starting at (x,y) in direction (dx,dy)
+    #
+    # PARAM [int] x:  the x coordinate of the starting cell
+    # PARAM [int] y:  the y coordinate of the starting cell
+    # PARAM [int] dx: the step in the x direction
+    # PARAM [int] dy: the step in the y direction
+    # RETURN [Bool]: True if n tokens of the same type have been found, False otherwise
+    def is_line_at(self, x, y, dx, dy):
+        """Return True if a line of identical tokens exists starting at (x,y) in direction (dx,dy)"""
+        # Avoid out-of-bounds errors
+        if ((x + (self.n-1) * dx >= self.w) or
+            (y + (self.n-1) * dy < 0) or (y + (self.n-1) * dy >= self.h)):
+            return False
+        # Get token at (x,y)
+        t = self.cell(x, y)
+        # Go through elements
+        for i in range(1, self.n):
+            if self.cell(x + i*dx, y + i*dy) != t:
+                return False
+        return True
+
+    # Check if a bitmask contains n tokens in a row.
+    #
+    # PARAM [int] mask: the bitmask of a player's tokens
+    # RETURN [Bool]: True if n tokens in a row exist in any direction
+    def has_line(self, mask):
+        """Return True if the given bitmask contains n tokens in a row"""
+        # Vertical, diagonal down, horizontal, diagonal up
+        for s in (1, self.h, self.h + 1, self.h + 2):
+            m = mask
+            k = 1
+            # Each step doubles (at most) the run length m encodes
+            while k < self.n:
+                step = min(k, self.n - k)
+                m &= m >> (s * step)
+                k += step
+            if m:
+                return True
+        return False
+
+    # Calculate the game outcome.
+    #
+    # RETURN [int]: 1 for Player 1, 2 for Player 2, and 0 for no winner
+    def get_outcome(self):
+        """Returns the winner of the game: 1 for Player 1, 2 for Player 2, and 0 for no winner"""
+        if self.outcome is None:
+            if self.has_line(self.masks[1]):
+                self.outcome = 1
+            elif self.has_line(self.masks[2]):
+                self.outcome = 2
+            else:
+                self.outcome = 0
+        return self.outcome
+
+    # Adds a token for the current player at the given column
+    #
+    # PARAM [int] x: The column where the token must be added; the column is assumed not full.
+    #
+    # NOTE: This method switches the current player.
+    def add_token(self, x):
+        """Adds a token for the current player at column x; the column is assumed not full"""
+        self.masks[self.player] |= 1 << (x * (self.h + 1) + self.heights[x])
+        self.hash ^= self.keys[self.player][x * self.h + self.heights[x]]
+        self.moves.append((x, self.heights[x], self.player, self.outcome))
+        self.last_move = (x, self.heights[x])
+        if self.grid is not None:
+            list.__setitem__(self.grid[self.heights[x]], x, self.player)
+        self.heights[x] += 1
+        # Update the cached outcome; only the mover can have a new line
+        if self.outcome == 0 and self.has_line(self.masks[self.player]):
+            self.outcome = self.player
+        # Switch player
+        if self.player == 1:
+            self.player = 2
+        else:
+            self.player = 1
+
+    # Removes the last token added with add_token()
+    #
+    # RETURN [int]: the column the token was removed from
+    #
+    # NOTE: This method restores the current player and the cached outcome.
+    def undo_token(self):
+        """Removes the last token added; returns its column"""
+        (x, y, player, outcome) = self.moves.pop()
+        self.masks[player] &= ~(1 << (x * (self.h + 1) + y))
+        self.heights[x] -= 1
+        self.hash ^= self.keys[player][x * self.h + y]
+        if self.grid is not None:
+            list.__setitem__(self.grid[y], x, 0)
+        self.player = player
+        self.outcome = outcome
+        if self.moves:
+            self.last_move = self.moves[-1][:2]
+        else:
+            self.last_move = None
+        return x
+
+    # Returns a list of the columns with at least one free slot.
+    #
+    # RETURN [list of int]: the columns with at least one free slot
+    def free_cols(self):
+        """Returns a list of the columns with at least one free slot"""
+        return [x for x in range(self.w) if self.heights[x] < self.h]
+
+    # Prints the current board state.
+    def print_it(self):
+        brd = self.board
+        print("+", "-" * self.w, "+", sep='')
+        for y in range(self.h-1, -1, -1):
+            print("|", sep='', end='')
+            for x in range(self.w):
+                if brd[y][x] == 0:
+                    print(" ", end='')
+                else:
+                    print(brd[y][x], end='')
+            print("|")
+        print("+", "-" * self.w, "+", sep='')
+        print(" ", end='')
+        for i in range(self.w):
+            print(i, end='')
+        print("")
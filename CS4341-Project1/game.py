@@ -17,14 +17,38 @@ class Game(object):
     # PARAM [int]         n:  the number of tokens to line up to win
     # PARAM [agent.Agent] p1: the agent for Player 1
     # PARAM [agent.Agent] p2: the agent for Player 2
-    def __init__(self, w, h, n, p1, p2):
+    # PARAM [class]       board_class: the board implementation to use
+    #                                  (board.Board or board.BitBoard)
+    # PARAM [instrumentation.MoveRecorder] recorder: records the cost of each
+    #                                                move of the timed games,
+    #                                                or None
+    def __init__(self, w, h, n, p1, p2, board_class=board.Board, recorder=None):
         """Class constructor"""
         # Create board
-        self.board = board.Board([[0] * w for i in range(h)], w, h, n)
+        self.board = board_class([[0] * w for i in range(h)], w, h, n)
         # Players
         self.players = [ p1, p2 ]
         p1.player = 1
         p2.player = 2
+        # Columns played, seconds taken by each move, and how the game ended
+        # ("win", "tie", "illegal" or "timeout"); filled in by the timed games
+        self.moves = []
+        self.move_times = []
+        self.end_reason = None
+        # Per-move instrumentation
+        self.recorder = recorder
+
+    # Ask a player for a move and time it.
+    #
+    # PARAM  [int] p: the index of the player (0 or 1)
+    # RETURN [(int, float)]: the column chosen and the seconds it took
+    def timed_move(self, p):
+        # Copy board so player can't modify it
+        if self.recorder is not None:
+            return self.recorder.measure(self.players[p], self.board.copy(), p + 1)
+        st = time.perf_counter()
+        x = self.players[p].go(self.board.copy())
+        return (x, time.perf_counter() - st)
 
     # Execute the game.
     #
@@ -47,6 +71,7 @@ class Game(object):
                 return outcome
             # Legal move, add token there
             self.board.add_token(x)
+            self.players[1 - p].opponent_moved(self.board.copy(), x)
             # Switch player
             if p == 0:
                 p = 1
@@ -74,26 +99,27 @@ class Game(object):
         # Current player
         p = 0
         while self.board.free_cols() and self.board.get_outcome() == 0:
-            # Get start time
-            st = time.time()
-            # Make move and copy board so player can't modify it
-            x = self.players[p].go(self.board.copy())
-            # Get elapsed time
-            et = time.time() - st
+            # Make move and get elapsed time
+            (x, et) = self.timed_move(p)
+            self.move_times.append(et)
             # Is the move legal and within the time limit?
             if (not x in self.board.free_cols()) or (et > limit):
+                self.end_reason = "timeout" if x in self.board.free_cols() else "illegal"
                 outcome = 1
                 if p == 0:
                     outcome = 2
                 return outcome
             # Legal move, add token there
             self.board.add_token(x)
+            self.moves.append(x)
+            self.players[1 - p].opponent_moved(self.board.copy(), x)
             # Switch player
             if p == 0:
                 p = 1
             else:
                 p = 0
         # Return game outcome
+        self.end_reason = "win" if self.board.get_outcome() != 0 else "tie"
         return self.board.get_outcome()
 
     # Execute a timed game.
@@ -112,14 +138,12 @@ class Game(object):
             # Current player
             p = 0
             while self.board.free_cols() and self.board.get_outcome() == 0:
-                # Get start time
-                st = time.time()
-                # Make move and copy board so player can't modify it
-                x = self.players[p].go(self.board.copy())
-                # Get elapsed time
-                et = time.time() - st
+                # Make move and get elapsed time
+                (x, et) = self.timed_move(p)
+                self.move_times.append(et)
                 # Is the move legal and within the time limit?
                 if (not x in self.board.free_cols()) or (et > limit):
+                    self.end_reason = "timeout" if x in self.board.free_cols() else "illegal"
                     # Illegal/out of time, nothing to log, end of game
                     outcome = 1
                     if p == 0:
@@ -127,6 +151,8 @@ class Game(object):
                     return outcome
                 # Legal move, add token there
                 self.board.add_token(x)
+                self.moves.append(x)
+                self.players[1 - p].opponent_moved(self.board.copy(), x)
                 # Log move
                 log.write("{} {}\n".format(self.players[p].name, x))
                 # Switch player
@@ -135,6 +161,7 @@ class Game(object):
                 else:
                     p = 0
             # Game ended successfully, log the outcome
+            self.end_reason = "win" if self.board.get_outcome() != 0 else "tie"
             if self.board.get_outcome() == 0:
                 log.write("- tie\n".format(self.players[0].name))
             else:
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import collections
+import struct
+import sys
+from pathlib import Path
+
+import board
+
+################
+# Game Records #
+################
+
+# A record file is a magic string followed by any number of game records, so
+# games can be appended as they finish and read back one at a time. A record
+# is:
+#
+#   header      w, h, n, outcome, end reason, move count, time count,
+#               name lengths (see RECORD)
+#   names       the two player names, UTF-8
+#   moves       the columns played, two per byte if w <= 16, else one per byte
+#   move times  float32 seconds, one per move asked (a forfeited move has a
+#               time but no column)
+
+MAGIC = b"CNGR\x01"
+RECORD = struct.Struct("<BBBBBHHBB")
+# End reasons, as in game.Game.end_reason
+REASONS = ["win", "tie", "illegal", "timeout"]
+
+# A game read back from a record file
+GameRecord = collections.namedtuple("GameRecord",
+    ["w", "h", "n", "players", "outcome", "end_reason", "moves", "move_times"])
+
+# Pack column indices.
+#
+# PARAM [list of int] moves: the columns played
+# PARAM [int]         w:     the board width
+# RETURN [bytes]: the packed columns
+def pack_moves(moves, w):
+    """Returns the columns packed two per byte if w <= 16, one per byte otherwise"""
+    if w > 16:
+        return bytes(moves)
+    packed = bytearray((len(moves) + 1) // 2)
+    for (i, x) in enumerate(moves):
+        packed[i // 2] |= x << (4 * (i % 2))
+    return bytes(packed)
+
+# Unpack column indices.
+#
+# PARAM [bytes] data:  the packed columns
+# PARAM [int]   count: the number of columns
+# PARAM [int]   w:     the board width
+# RETURN [list of int]: the columns played
+def unpack_moves(data, count, w):
+    """Returns the columns packed by pack_moves()"""
+    if w > 16:
+        return list(data[:count])
+    return [(data[i // 2] >> (4 * (i % 2))) & 0xF for i in range(count)]
+
+class GameRecordWriter(object):
+    """Appends game records to a file"""
+
+    # Class constructor.
+    #
+    # PARAM [string] path: the path of the record file
+    def __init__(self, path):
+        """Class constructor"""
+        new = not Path(path).exists() or Path(path).stat().st_size == 0
+        self.f = Path(path).open("ab")
+        if new:
+            self.f.write(MAGIC)
+
+    # Append a game.
+    #
+    # PARAM [int]            w:          the board width
+    # PARAM [int]            h:          the board height
+    # PARAM [int]            n:          the number of tokens to line up to win
+    # PARAM [list of string] players:    the names of Player 1 and Player 2
+    # PARAM [int]            outcome:    1 for Player 1, 2 for Player 2, 0 for a tie
+    # PARAM [string]         end_reason: "win", "tie", "illegal" or "timeout"
+    # PARAM [list of int]    moves:      the columns played
+    # PARAM [list of float]  move_times: the seconds taken by each move
+    def write(self, w, h, n, players, outcome, end_reason, moves, move_times):
+        """Appends a game record"""
+        names = [p.encode("utf-8") for p in players]
+        self.f.write(RECORD.pack(w, h, n, outcome, REASONS.index(end_reason),
+                                 len(moves), len(move_times),
+                                 len(names[0]), len(names[1])))
+        self.f.write(names[0])
+        self.f.write(names[1])
+        self.f.write(pack_moves(moves, w))
+        self.f.write(struct.pack("<{}f".format(len(move_times)), *move_times))
+
+    # Append a finished game.
+    #
+    # PARAM [game.Game] g:       the game, after timed_go() or logged_go()
+    # PARAM [int]       outcome: the game outcome
+    def write_game(self, g, outcome):
+        """Appends the record of a finished game"""
+        self.write(g.board.w, g.board.h, g.board.n,
+                   [p.name for p in g.players], outcome, g.end_reason,
+                   g.moves, g.move_times)
+
+    # Flush and close the file.
+    def close(self):
+        """Closes the record file"""
+        self.f.close()
+
+# Read the games of a record file one at a time.
+#
+# PARAM [string] path: the path of the record file
+# RETURN [generator of GameRecord]: the games, in file order
+def read_records(path):
+    """Yields the games stored in a record file"""
+    with Path(path).open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise RuntimeError("Not a game record file: {}".format(path))
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            (w, h, n, outcome, reason, nmoves, ntimes, l1, l2) = RECORD.unpack(head)
+            p1 = f.read(l1).decode("utf-8")
+            p2 = f.read(l2).decode("utf-8")
+            size = nmoves if w > 16 else (nmoves + 1) // 2
+            moves = unpack_moves(f.read(size), nmoves, w)
+            times = list(struct.unpack("<{}f".format(ntimes), f.read(4 * ntimes)))
+            yield GameRecord(w, h, n, (p1, p2), outcome, REASONS[reason], moves, times)
+
+# Convert a text log written by game.Game.logged_go().
+#
+# The board settings come from the file name (<w>_<h>_<n>_<p1>_<p2>.dat);
+# text logs have no move times. Player names may contain spaces, so each line
+# is split on its last space only.
+#
+# PARAM [Path] path: the path of the log file
+# RETURN [GameRecord]: the game
+#
+# NOTE: raises ValueError if the file is truncated or malformed.
+def read_text_log(path):
+    """Returns the game stored in a .dat log file"""
+    (w, h, n) = (int(v) for v in Path(path).stem.split("_")[:3])
+    with Path(path).open() as f:
+        lines = [ln.rstrip("\n") for ln in f if ln.strip()]
+    if (len(lines) < 2 or not lines[0].endswith(" player1") or
+        not lines[1].endswith(" player2")):
+        raise ValueError("missing player lines")
+    players = (lines[0][:-len(" player1")], lines[1][:-len(" player2")])
+    moves = []
+    outcome = None
+    reason = None
+    for ln in lines[2:]:
+        parts = ln.rsplit(None, 1)
+        if len(parts) != 2:
+            raise ValueError("malformed line: {!r}".format(ln))
+        (who, what) = parts
+        if what == "wins":
+            outcome = players.index(who) + 1
+            reason = "win"
+        elif what == "tie":
+            outcome = 0
+            reason = "tie"
+        elif what.isdigit():
+            moves.append(int(what))
+        else:
+            raise ValueError("malformed line: {!r}".format(ln))
+    if outcome is None:
+        # No final line: the player to move forfeited
+        outcome = 1 if len(moves) % 2 == 1 else 2
+        reason = "illegal"
+    return GameRecord(w, h, n, players, outcome, reason, moves, [])
+
+# Replay a game, printing the board after each move.
+#
+# PARAM [GameRecord] rec: the game
+def replay(rec):
+    """Prints the game move by move"""
+    brd = board.Board([[0] * rec.w for i in range(rec.h)], rec.w, rec.h, rec.n)
+    for (i, x) in enumerate(rec.moves):
+        brd.add_token(x)
+        t = " ({:.3f}s)".format(rec.move_times[i]) if i < len(rec.move_times) else ""
+        print(rec.players[i % 2], "move:", x, t)
+        brd.print_it()
+    if rec.outcome == 0:
+        print("It's a tie!")
+    else:
+        print(rec.players[rec.outcome - 1], "won!", "({})".format(rec.end_reason))
+
+# Count the openings of a set of games.
+#
+# PARAM [iterable of GameRecord] records: the games
+# PARAM [int]                    plies:   the length of the openings
+# RETURN [collections.Counter]: opening (tuple of columns) -> number of games
+def opening_frequency(records, plies):
+    """Returns how often each opening of the given length was played"""
+    return collections.Counter(tuple(r.moves[:plies]) for r in records if len(r.moves) >= plies)
+
+# Build a histogram of move times per player.
+#
+# PARAM [iterable of GameRecord] records: the games
+# PARAM [list of float]          edges:   the upper bounds of the bins, in seconds
+# RETURN [dict]: player name -> list of counts, one per bin plus one for
+#                times above the last edge
+def move_time_histogram(records, edges):
+    """Returns a histogram of move times for each player"""
+    hist = {}
+    for r in records:
+        for (i, t) in enumerate(r.move_times):
+            counts = hist.setdefault(r.players[i % 2], [0] * (len(edges) + 1))
+            b = 0
+            while b < len(edges) and t > edges[b]:
+                b = b + 1
+            counts[b] += 1
+    return hist
+
+if __name__ == "__main__":
+    usage = ("Usage:\n"
+             "  {0} convert <datadir> <record file>\n"
+             "  {0} replay <record file> <game index>\n"
+             "  {0} openings <record file> <plies> [top]\n"
+             "  {0} times <record file>").format(sys.argv[0])
+    if len(sys.argv) < 3:
+        print(usage)
+        sys.exit(1)
+    cmd = sys.argv[1]
+    if cmd == "convert" and len(sys.argv) == 4:
+        writer = GameRecordWriter(sys.argv[3])
+        count = 0
+        for p in sorted(Path(sys.argv[2]).glob("*.dat")):
+            try:
+                r = read_text_log(p)
+            except ValueError as e:
+                # Truncated logs, e.g. from a killed run, are left out
+                print(p, "skipped:", e)
+                continue
+            writer.write(r.w, r.h, r.n, r.players, r.outcome, r.end_reason, r.moves, r.move_times)
+            count = count + 1
+        writer.close()
+        print(count, "games converted")
+    elif cmd == "replay" and len(sys.argv) == 4:
+        index = int(sys.argv[3])
+        for (i, r) in enumerate(read_records(sys.argv[2])):
+            if i == index:
+                replay(r)
+                break
+    elif cmd == "openings" and len(sys.argv) in [4,5]:
+        top = int(sys.argv[4]) if len(sys.argv) == 5 else 20
+        freq = opening_frequency(read_records(sys.argv[2]), int(sys.argv[3]))
+        for (opening, count) in freq.most_common(top):
+            print(count, " ".join(str(x) for x in opening))
+    elif cmd == "times":
+        edges = [0.001, 0.01, 0.1, 1, 5, 10]
+        print("player", " ".join("<={}".format(e) for e in edges), ">{}".format(edges[-1]))
+        for (name, counts) in sorted(move_time_histogram(read_records(sys.argv[2]), edges).items()):
+            print(name, " ".join(str(c) for c in counts))
+    else:
+        print(usage)
+        sys.exit(1)
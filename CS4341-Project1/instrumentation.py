@@ -0,0 +1,103 @@
+import csv
+import json
+import time
+import tracemalloc
+
+###################
+# Move Recorder   #
+###################
+
+class MoveRecorder(object):
+    """Records per-move timing, memory and search statistics of a game"""
+
+    # Class constructor.
+    #
+    # PARAM [bool] track_memory: if True, record the peak memory allocated
+    #                            during each move with tracemalloc (this
+    #                            slows the agents down noticeably)
+    def __init__(self, track_memory=False):
+        """Class constructor"""
+        self.track_memory = track_memory
+        # One dict per move, see measure()
+        self.records = []
+
+    # Ask an agent for a move and record how it went.
+    #
+    # The record holds the ply, player, agent name, column, wall time
+    # ("wall", from a monotonic high-resolution clock), CPU time of this
+    # process ("cpu"), peak memory allocated during the move in bytes
+    # ("peak_mem", None unless track_memory is set), and any statistics the agent exposes in a 'stats'
+    # dict (e.g. AlphaBetaAgent's nodes, cutoffs, depth and tt_hits).
+    #
+    # PARAM [agent.Agent] agt:    the agent to move
+    # PARAM [board.Board] brd:    the board to pass to the agent
+    # PARAM [int]         player: the player number of the agent
+    # RETURN [(int, float)]: the column chosen and the wall time taken
+    def measure(self, agt, brd, player):
+        """Runs agt.go(brd) and records its cost; returns (column, wall time)"""
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        st = time.perf_counter()
+        ct = time.process_time()
+        x = agt.go(brd)
+        cpu = time.process_time() - ct
+        et = time.perf_counter() - st
+        peak = tracemalloc.get_traced_memory()[1] - base if self.track_memory else None
+        rec = {
+            "ply": len(self.records),
+            "player": player,
+            "agent": agt.name,
+            "column": x,
+            "wall": et,
+            "cpu": cpu,
+            "peak_mem": peak,
+        }
+        stats = getattr(agt, "stats", None)
+        if isinstance(stats, dict):
+            rec.update(stats)
+        self.records.append(rec)
+        return (x, et)
+
+    # Get the columns of the records, in a stable order.
+    #
+    # RETURN [list of string]: the record keys
+    def fields(self):
+        """Returns the union of the record keys, common ones first"""
+        keys = ["ply", "player", "agent", "column", "wall", "cpu", "peak_mem"]
+        for rec in self.records:
+            for k in rec:
+                if k not in keys:
+                    keys.append(k)
+        return keys
+
+    # Write the records of a game as JSON.
+    #
+    # PARAM [string]    path: the path of the JSON file
+    # PARAM [game.Game] g:    the game the records belong to
+    def write_json(self, path, g):
+        """Writes the game settings, outcome and move records as JSON"""
+        data = {
+            "w": g.board.w,
+            "h": g.board.h,
+            "n": g.board.n,
+            "players": [p.name for p in g.players],
+            "outcome": g.board.get_outcome(),
+            "end_reason": g.end_reason,
+            "moves": self.records,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    # Write the move records of a game as CSV, one row per move.
+    #
+    # PARAM [string] path: the path of the CSV file
+    def write_csv(self, path):
+        """Writes the move records as CSV"""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fields())
+            writer.writeheader()
+            for rec in self.records:
+                writer.writerow(rec)
@@ -1,23 +1,14 @@
 #!/usr/bin/env python3
 
-from pathlib import Path
-from tokenize import tokenize
-
-imports = []
-players = []
+import player_registry
 
 # Go through the directories
-for d in Path("unzipped").iterdir():
-    # Get the player name
-    pname = d.name.split('/')[0]
-    imports.append("from unzipped.{0}.alpha_beta_agent import THE_AGENT as {0}".format(pname))
-    players.append("    \"{0}\" : {0},".format(pname))
-
-# Print the file
-for i in imports:
-    print(i)
-
-print("PLAYERS = {")
-for p in players:
-    print(p)
-print("}")
+names = player_registry.discover("unzipped")
+
+# Print the file; agents are only imported when a match needs them
+print("import player_registry")
+print("")
+print("PLAYERS = player_registry.LazyPlayers([")
+for pname in names:
+    print("    \"{0}\",".format(pname))
+print("])")
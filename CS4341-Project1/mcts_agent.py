@@ -0,0 +1,407 @@
+import math
+import multiprocessing
+import random
+import time
+
+import agent
+
+#################
+# Playout board #
+#################
+
+class PlayoutBoard(object):
+    """Minimal board for random playouts: a flat cell array plus column heights"""
+
+    # Cell (x,y) is at index x*h+y. Only the lines through the last token are
+    # checked for a win, so a move costs O(n). rays[i] lists, for each of the
+    # four directions, the indices of the up to n-1 cells on either side of
+    # cell i, so the checks need no coordinate arithmetic or bounds tests.
+
+    # Build a playout board from a game board.
+    #
+    # PARAM [board.Board] brd: the board state
+    def __init__(self, brd):
+        """Class constructor"""
+        self.w = brd.w
+        self.h = brd.h
+        self.n = brd.n
+        self.player = brd.player
+        grid = brd.board
+        self.cells = [grid[y][x] for x in range(brd.w) for y in range(brd.h)]
+        self.heights = [0] * brd.w
+        for x in range(brd.w):
+            while self.heights[x] < brd.h and grid[self.heights[x]][x] != 0:
+                self.heights[x] += 1
+        # Columns with at least one free slot
+        self.free = [x for x in range(brd.w) if self.heights[x] < brd.h]
+        self.rays = playout_rays(brd.w, brd.h, brd.n)
+
+    # Clone a playout board.
+    #
+    # RETURN [PlayoutBoard]: a copy of this object
+    def copy(self):
+        """Returns a copy of this board that can be independently modified"""
+        cpy = PlayoutBoard.__new__(PlayoutBoard)
+        cpy.w = self.w
+        cpy.h = self.h
+        cpy.n = self.n
+        cpy.player = self.player
+        cpy.cells = self.cells[:]
+        cpy.heights = self.heights[:]
+        cpy.free = self.free[:]
+        cpy.rays = self.rays
+        return cpy
+
+    # Check if a token of player p at cell i completes a line.
+    #
+    # PARAM [int] i: the index of the cell
+    # PARAM [int] p: the player
+    # RETURN [Bool]: True if a line of n tokens of player p goes through cell i
+    def is_line_through(self, i, p):
+        cells = self.cells
+        for (fwd, back) in self.rays[i]:
+            k = 1
+            for j in fwd:
+                if cells[j] != p:
+                    break
+                k += 1
+            for j in back:
+                if cells[j] != p:
+                    break
+                k += 1
+            if k >= self.n:
+                return True
+        return False
+
+    # Check if a token of player p at the given column would complete a line.
+    #
+    # PARAM [int] x: the column; the column is assumed not full
+    # PARAM [int] p: the player
+    # RETURN [Bool]: True if the token would win the game
+    def wins_at(self, x, p):
+        """Returns True if player p would win by playing column x"""
+        return self.is_line_through(x * self.h + self.heights[x], p)
+
+    # Add a token for the current player at the given column.
+    #
+    # PARAM [int] x: the column; the column is assumed not full
+    # RETURN [int]: the player who moved if the token completes a line, 0 otherwise
+    #
+    # NOTE: This method switches the current player.
+    def play(self, x):
+        """Adds a token at column x; returns the mover if it won, 0 otherwise"""
+        p = self.player
+        y = self.heights[x]
+        i = x * self.h + y
+        self.cells[i] = p
+        self.heights[x] = y + 1
+        if y + 1 == self.h:
+            self.free.remove(x)
+        self.player = 3 - p
+        if self.is_line_through(i, p):
+            return p
+        return 0
+
+# Cache of the ray tables, by board settings
+RAYS = {}
+
+# Build the ray table of a board size.
+#
+# PARAM [int] w: the board width
+# PARAM [int] h: the board height
+# PARAM [int] n: the number of tokens to line up to win
+# RETURN [list of tuple]: for each cell index, ((forward cells, backward
+#                         cells), ...) for the four directions
+def playout_rays(w, h, n):
+    """Returns the cells within n-1 steps of each cell in the four directions"""
+    if (w, h, n) not in RAYS:
+        rays = []
+        for x in range(w):
+            for y in range(h):
+                dirs = []
+                for (dx, dy) in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                    sides = []
+                    for s in (1, -1):
+                        side = []
+                        for k in range(1, n):
+                            (cx, cy) = (x + s * k * dx, y + s * k * dy)
+                            if not (0 <= cx < w and 0 <= cy < h):
+                                break
+                            side.append(cx * h + cy)
+                        sides.append(tuple(side))
+                    dirs.append(tuple(sides))
+                rays.append(tuple(dirs))
+        RAYS[(w, h, n)] = rays
+    return RAYS[(w, h, n)]
+
+# Play to the end of the game.
+#
+# Moves are random, except that a player takes a win when it has one and
+# otherwise blocks a win of the opponent. Purely random playouts miss
+# threats that any opponent would see, which misleads the tree on large n.
+#
+# PARAM [PlayoutBoard]  pb:  the board; it is modified
+# PARAM [random.Random] rng: the random number generator
+# RETURN [int]: 1 or 2 for the winner, 0 for a tie
+def playout(pb, rng):
+    """Plays pb out; returns the outcome"""
+    while pb.free:
+        p = pb.player
+        move = None
+        for x in pb.free:
+            if pb.wins_at(x, p):
+                return p
+            if move is None and pb.wins_at(x, 3 - p):
+                move = x
+        if move is None:
+            move = rng.choice(pb.free)
+        winner = pb.play(move)
+        if winner:
+            return winner
+    return 0
+
+#############
+# Game tree #
+#############
+
+class Node(object):
+    """Node of the search tree"""
+
+    # Class constructor.
+    #
+    # PARAM [Node] parent: the parent node, None for the root
+    # PARAM [int]  move:   the column played to reach this node
+    # PARAM [int]  player: the player who played that column
+    # PARAM [list of int] free: the columns that can be played from here
+    # PARAM [int]  result: the outcome if the game is over here, None otherwise
+    def __init__(self, parent, move, player, free, result=None):
+        """Class constructor"""
+        self.parent = parent
+        self.move = move
+        self.player = player
+        # Children by column, and the columns not expanded yet
+        self.children = {}
+        self.untried = free if result is None else []
+        # Number of playouts through this node, and their score for player
+        # (1 for a win, 0.5 for a tie)
+        self.visits = 0
+        self.wins = 0.0
+        self.result = result
+
+    # Pick the child with the best upper confidence bound.
+    #
+    # PARAM [float] c: the exploration constant
+    # RETURN [Node]: the child
+    def select(self, c):
+        """Returns the child maximizing the UCT score"""
+        log_n = math.log(self.visits)
+        best = None
+        best_score = -1.0
+        for child in self.children.values():
+            score = child.wins / child.visits + c * math.sqrt(log_n / child.visits)
+            if score > best_score:
+                best = child
+                best_score = score
+        return best
+
+# Grow a tree.
+#
+# PARAM [Node]          root:       the root node
+# PARAM [PlayoutBoard]  pb:         the board at the root; it is not modified
+# PARAM [float]         deadline:   the time at which to stop, None for no limit
+# PARAM [int]           iterations: the number of playouts, None for no limit
+# PARAM [float]         c:          the exploration constant
+# PARAM [random.Random] rng:        the random number generator
+# RETURN [int]: the number of playouts done
+def grow(root, pb, deadline, iterations, c, rng):
+    """Runs selection, expansion, playout and backpropagation until out of time or iterations"""
+    i = 0
+    while iterations is None or i < iterations:
+        # Reading the clock is comparatively slow
+        if deadline is not None and i % 32 == 0 and time.perf_counter() >= deadline:
+            break
+        i += 1
+        node = root
+        b = pb.copy()
+        # Selection
+        while not node.untried and node.children:
+            node = node.select(c)
+            b.play(node.move)
+        # Expansion
+        if node.untried:
+            col = node.untried.pop(rng.randrange(len(node.untried)))
+            mover = b.player
+            winner = b.play(col)
+            if winner:
+                result = winner
+            elif not b.free:
+                result = 0
+            else:
+                result = None
+            child = Node(node, col, mover, b.free[:], result)
+            node.children[col] = child
+            node = child
+        # Playout
+        if node.result is not None:
+            result = node.result
+        else:
+            result = playout(b, rng)
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if result == node.player:
+                node.wins += 1.0
+            elif result == 0:
+                node.wins += 0.5
+            node = node.parent
+    return i
+
+# Search a position from scratch in a pool process (root parallelism).
+#
+# PARAM [tuple] task: (board, time budget in seconds or None, iterations or
+#                     None, exploration constant, random seed)
+# RETURN [dict]: column -> (visits, wins) of the root children
+def search_root_stats(task):
+    (brd, budget, iterations, c, seed) = task
+    pb = PlayoutBoard(brd)
+    root = Node(None, None, 3 - pb.player, pb.free[:])
+    deadline = None
+    if budget is not None:
+        deadline = time.perf_counter() + budget
+    grow(root, pb, deadline, iterations, c, random.Random(seed))
+    return {col: (ch.visits, ch.wins) for (col, ch) in root.children.items()}
+
+############################
+# Monte Carlo Search Agent #
+############################
+
+class MCTSAgent(agent.Agent):
+    """Agent that uses Monte Carlo tree search (UCT)"""
+
+    # Class constructor.
+    #
+    # PARAM [string] name:          the name of this player
+    # PARAM [float]  time_limit:    the time limit for a move in seconds
+    # PARAM [float]  time_fraction: the fraction of time_limit to use
+    # PARAM [int]    iterations:    the number of playouts per move; if set,
+    #                               the search stops after that many playouts
+    #                               even if time is left
+    # PARAM [float]  c:             the UCT exploration constant
+    # PARAM [bool]   reuse:         if True, keep the subtree of the position
+    #                               reached from one move to the next
+    # PARAM [int]    workers:       the number of processes growing separate
+    #                               trees whose root statistics are summed;
+    #                               1 for a single tree
+    def __init__(self, name, time_limit=1.0, time_fraction=0.5, iterations=None,
+                 c=math.sqrt(2), reuse=True, workers=1):
+        super().__init__(name)
+        self.time_limit = time_limit
+        self.time_fraction = time_fraction
+        self.iterations = iterations
+        self.c = c
+        self.reuse = reuse
+        # Search tree kept between moves, and the hash of its root position
+        self.root = None
+        self.root_hash = None
+        # Root parallelism; the pool is created on first use and reused
+        self.workers = workers
+        self.pool = None
+        # Search statistics of the last call to go(): playouts done, playouts
+        # inherited from the previous move, and visits of the chosen move
+        self.stats = {"playouts": 0, "reused": 0, "visits": 0}
+
+    # The pool can't be pickled; the tree isn't worth copying.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["workers"] = 1
+        state["root"] = None
+        state["root_hash"] = None
+        return state
+
+    # Shut down the worker processes, if any.
+    def close(self):
+        """Terminates the worker processes of the parallel search"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    # Pick a column.
+    #
+    # PARAM [board.Board] brd: the current board state
+    # RETURN [int]: the column where the token must be added
+    def go(self, brd):
+        """Search for the best move (choice of column for the token)"""
+        budget = None
+        if self.time_limit is not None:
+            budget = self.time_limit * self.time_fraction
+        deadline = None
+        if budget is not None:
+            deadline = time.perf_counter() + budget
+        if self.workers > 1:
+            totals = self.parallel_search(brd, budget)
+            self.root = None
+        else:
+            totals = self.tree_search(brd, deadline)
+        # Most visited child; break ties on the score
+        move = max(totals, key=lambda col: totals[col])
+        self.stats["visits"] = totals[move][0]
+        if self.root is not None:
+            self.root = self.root.children.get(move)
+            if self.root is not None:
+                self.root.parent = None
+                self.root_hash = None
+        return move
+
+    # Learn about the opponent's move, to find the subtree to reuse.
+    #
+    # PARAM [board.Board] brd: the board state after the opponent's move
+    # PARAM [int]         col: the column the opponent played
+    def opponent_moved(self, brd, col):
+        """Moves the root of the kept tree down to the current position"""
+        if self.root is not None and col in self.root.children:
+            self.root = self.root.children[col]
+            self.root.parent = None
+            self.root_hash = brd.hash
+        else:
+            self.root = None
+
+    # Grow a single tree, reusing the kept one if it matches.
+    #
+    # PARAM [board.Board] brd:      the current board state
+    # PARAM [float]       deadline: the time at which to stop, None for no limit
+    # RETURN [dict]: column -> (visits, wins) of the root children
+    def tree_search(self, brd, deadline):
+        pb = PlayoutBoard(brd)
+        if not self.reuse or self.root is None or self.root_hash != brd.hash:
+            self.root = Node(None, None, 3 - pb.player, pb.free[:])
+        self.root_hash = brd.hash
+        self.stats["reused"] = self.root.visits
+        self.stats["playouts"] = grow(self.root, pb, deadline, self.iterations, self.c, random)
+        # The root has at least one child once a playout is done
+        if not self.root.children:
+            grow(self.root, pb, None, 1, self.c, random)
+        return {col: (ch.visits, ch.wins) for (col, ch) in self.root.children.items()}
+
+    # Grow one tree per worker and sum their root statistics.
+    #
+    # PARAM [board.Board] brd:    the current board state
+    # PARAM [float]       budget: the time budget in seconds, None for no limit
+    # RETURN [dict]: column -> (visits, wins) summed over the trees
+    def parallel_search(self, brd, budget):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        iterations = self.iterations
+        if iterations is not None:
+            iterations = max(1, iterations // self.workers)
+        tasks = [(brd, budget, iterations, self.c, random.getrandbits(64))
+                 for i in range(self.workers)]
+        totals = {}
+        for stats in self.pool.imap_unordered(search_root_stats, tasks):
+            for (col, (v, w)) in stats.items():
+                (tv, tw) = totals.get(col, (0, 0.0))
+                totals[col] = (tv + v, tw + w)
+        self.stats["reused"] = 0
+        self.stats["playouts"] = sum(v for (v, w) in totals.values())
+        return totals
@@ -0,0 +1,123 @@
+##################
+# Move Orderings #
+##################
+
+# Alpha-beta prunes most when the best move is searched first. An ordering
+# decides in which order the columns of a node are searched, and is told
+# about the moves that caused a cutoff so it can learn from them.
+
+class MoveOrdering(object):
+    """Default ordering: columns from left to right"""
+
+    # Mark the start of a new search.
+    def new_search(self):
+        """Resets the per-search state"""
+        pass
+
+    # Order the columns of a node.
+    #
+    # PARAM [board.Board] brd:  the board state
+    # PARAM [list of int] cols: the legal columns
+    # PARAM [int]         ply:  the ply of the node, counted from the root
+    # RETURN [list of int]: the columns in the order they must be searched
+    def order(self, brd, cols, ply):
+        """Returns the columns in search order"""
+        return cols
+
+    # Record a move that caused a cutoff.
+    #
+    # PARAM [board.Board] brd:   the board state (before the move)
+    # PARAM [int]         col:   the column that caused the cutoff
+    # PARAM [int]         ply:   the ply of the node, counted from the root
+    # PARAM [int]         depth: the remaining depth of the node
+    def cutoff(self, brd, col, ply, depth):
+        """Records a move that caused a cutoff"""
+        pass
+
+
+
+##########################
+# Center-first ordering  #
+##########################
+
+class CenterOrdering(MoveOrdering):
+    """Static ordering: columns from the center outwards"""
+
+    # Order the columns of a node.
+    #
+    # PARAM [board.Board] brd:  the board state
+    # PARAM [list of int] cols: the legal columns
+    # PARAM [int]         ply:  the ply of the node, counted from the root
+    # RETURN [list of int]: the columns, closest to the center first
+    def order(self, brd, cols, ply):
+        """Returns the columns from the center outwards"""
+        center = (brd.w - 1) / 2
+        return sorted(cols, key=lambda c: abs(c - center))
+
+
+
+#################################
+# Killer and history ordering   #
+#################################
+
+class KillerHistoryOrdering(CenterOrdering):
+    """Killer moves first, then columns by history score, then center-first"""
+
+    # Class constructor.
+    #
+    # PARAM [int] num_killers: the number of killer moves kept per ply
+    def __init__(self, num_killers=2):
+        """Class constructor"""
+        # Killer moves kept per ply
+        self.num_killers = num_killers
+        # killers[ply] is the list of recent cutoff moves at that ply
+        self.killers = []
+        # history[player][col] is the cutoff score of col for player
+        self.history = [dict(), dict(), dict()]
+
+    # Mark the start of a new search.
+    #
+    # Killers only make sense within a search; history scores are halved so
+    # that older searches count less.
+    def new_search(self):
+        """Resets the killers and ages the history scores"""
+        self.killers = []
+        for h in self.history:
+            for col in h:
+                h[col] //= 2
+
+    # Order the columns of a node.
+    #
+    # PARAM [board.Board] brd:  the board state
+    # PARAM [list of int] cols: the legal columns
+    # PARAM [int]         ply:  the ply of the node, counted from the root
+    # RETURN [list of int]: the columns in the order they must be searched
+    def order(self, brd, cols, ply):
+        """Returns killers first, then the rest by history and center distance"""
+        center = (brd.w - 1) / 2
+        hist = self.history[brd.player]
+        cols = sorted(cols, key=lambda c: (-hist.get(c, 0), abs(c - center)))
+        if ply < len(self.killers):
+            for k in reversed(self.killers[ply]):
+                if k in cols:
+                    cols.remove(k)
+                    cols.insert(0, k)
+        return cols
+
+    # Record a move that caused a cutoff.
+    #
+    # PARAM [board.Board] brd:   the board state (before the move)
+    # PARAM [int]         col:   the column that caused the cutoff
+    # PARAM [int]         ply:   the ply of the node, counted from the root
+    # PARAM [int]         depth: the remaining depth of the node
+    def cutoff(self, brd, col, ply, depth):
+        """Makes col a killer at this ply and raises its history score"""
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if col in killers:
+            killers.remove(col)
+        killers.insert(0, col)
+        del killers[self.num_killers:]
+        hist = self.history[brd.player]
+        hist[col] = hist.get(col, 0) + depth * depth
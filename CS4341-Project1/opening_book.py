@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import mmap
+import multiprocessing
+import struct
+import sys
+from pathlib import Path
+
+import board
+import move_ordering
+import alpha_beta_agent as aba
+
+#################
+# Opening Books #
+#################
+
+# A book maps the Zobrist hash of a position to the move a deep search picked
+# for the player to move. On disk it is a small header followed by records
+# sorted by hash, so it can be memory-mapped and binary-searched in place.
+
+# File header: magic, version, w, h, n, number of records
+HEADER = struct.Struct("<4sHHHHI")
+MAGIC = b"CNBK"
+VERSION = 1
+# Record: hash, move, search depth, value
+RECORD = struct.Struct("<QBBxxi")
+
+class OpeningBook(object):
+    """Read-only opening book backed by a memory-mapped file"""
+
+    # Class constructor.
+    #
+    # PARAM [string] path: the path of the book file
+    def __init__(self, path):
+        """Class constructor"""
+        with Path(path).open("rb") as f:
+            # Map the whole file; the mapping stays valid after closing f
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.w, self.h, self.n, self.count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError("Not an opening book: {}".format(path))
+
+    # Find a record by hash.
+    #
+    # PARAM [int] key: the Zobrist hash of the position
+    # RETURN [(int, int, int)]: (move, depth, value), or None if not in book
+    def get(self, key):
+        """Returns the (move, depth, value) record for the given hash, or None"""
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (k, move, depth, value) = RECORD.unpack_from(self.data, HEADER.size + mid * RECORD.size)
+            if k == key:
+                return (move, depth, value)
+            if k < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    # Look up the book move for a board.
+    #
+    # PARAM [board.Board] brd: the board state
+    # RETURN [int]: the book column, or None if the position is not in book
+    def lookup(self, brd):
+        """Returns the book move for the given board, or None"""
+        if (brd.w, brd.h, brd.n) != (self.w, self.h, self.n):
+            return None
+        rec = self.get(brd.hash)
+        if rec is None or rec[0] not in brd.free_cols():
+            return None
+        return rec[0]
+
+    # Release the memory mapping.
+    def close(self):
+        """Closes the book"""
+        self.data.close()
+
+####################
+# Book generation  #
+####################
+
+# Collect the positions reachable from the empty board in up to a number of
+# plies, without duplicates (transpositions) and without finished games.
+#
+# PARAM [int] w:     the board width
+# PARAM [int] h:     the board height
+# PARAM [int] n:     the number of tokens to line up to win
+# PARAM [int] plies: the number of plies to expand
+# RETURN [list of board.Board]: the positions, in breadth-first order
+def book_positions(w, h, n, plies):
+    """Returns the distinct unfinished positions within the first plies of the game"""
+    frontier = [board.BitBoard([[0] * w for i in range(h)], w, h, n)]
+    positions = []
+    seen = set()
+    for ply in range(plies + 1):
+        nxt = []
+        for brd in frontier:
+            if brd.hash in seen or brd.get_outcome() != 0 or not brd.free_cols():
+                continue
+            seen.add(brd.hash)
+            positions.append(brd)
+            if ply < plies:
+                for col in brd.free_cols():
+                    child = brd.copy()
+                    child.add_token(col)
+                    nxt.append(child)
+        frontier = nxt
+    return positions
+
+# Solve a single position (runs in a pool process).
+#
+# PARAM [(board.Board, int)] task: the position and the search depth
+# RETURN [(int, int, int, int)]: (hash, move, depth, value)
+def solve_position(task):
+    (brd, depth) = task
+    # The search can't go deeper than the number of empty cells
+    depth = min(depth, sum(brd.h - ht for ht in brd.heights))
+    agent = aba.AlphaBetaAgent("book", depth, in_place=True, tt_size=1 << 18,
+                               ordering=move_ordering.KillerHistoryOrdering(),
+                               incremental_eval=True)
+    agent.player = brd.player
+    move = agent.go(brd)
+    # Value of the chosen move, as stored in the table by the root search
+    entry = agent.tt.get(brd.hash)
+    value = int(entry[2]) if entry is not None else 0
+    return (brd.hash, move, depth, max(min(value, 2**31 - 1), -2**31))
+
+# Read the results saved so far by an interrupted generation.
+#
+# PARAM [Path] journal: the path of the journal file
+# RETURN [dict]: hash -> (move, depth, value)
+def read_journal(journal):
+    """Returns the results stored in the journal file"""
+    done = {}
+    if journal.exists():
+        with journal.open() as f:
+            for line in f:
+                fields = line.split()
+                # A crash can leave the last line incomplete
+                if len(fields) != 4:
+                    continue
+                (key, move, depth, value) = (int(v) for v in fields)
+                done[key] = (move, depth, value)
+    return done
+
+# Write a book file from a set of results.
+#
+# PARAM [string] path:    the path of the book file
+# PARAM [int]    w:       the board width
+# PARAM [int]    h:       the board height
+# PARAM [int]    n:       the number of tokens to line up to win
+# PARAM [dict]   results: hash -> (move, depth, value)
+def write_book(path, w, h, n, results):
+    """Writes the given results as a sorted book file"""
+    tmp = Path(str(path) + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, w, h, n, len(results)))
+        for key in sorted(results):
+            (move, depth, value) = results[key]
+            f.write(RECORD.pack(key, move, depth, value))
+    # Readers never see a half-written book
+    tmp.replace(path)
+
+# Generate a book.
+#
+# Every solved position is appended to <path>.journal as soon as it is done,
+# so an interrupted run picks up where it left off.
+#
+# PARAM [string] path:    the path of the book file
+# PARAM [int]    w:       the board width
+# PARAM [int]    h:       the board height
+# PARAM [int]    n:       the number of tokens to line up to win
+# PARAM [int]    plies:   the number of plies covered by the book
+# PARAM [int]    depth:   the search depth for each position
+# PARAM [int]    workers: the number of processes, None for one per core
+def generate_book(path, w, h, n, plies, depth, workers=None):
+    """Solves the first plies of the game and writes the book file"""
+    journal = Path(str(path) + ".journal")
+    done = read_journal(journal)
+    tasks = [(brd, depth) for brd in book_positions(w, h, n, plies)
+             if brd.hash not in done]
+    print(len(done), "positions already solved,", len(tasks), "to go")
+    with journal.open("a") as log, multiprocessing.Pool(workers) as pool:
+        for (key, move, d, value) in pool.imap_unordered(solve_position, tasks):
+            done[key] = (move, d, value)
+            log.write("{} {} {} {}\n".format(key, move, d, value))
+            log.flush()
+    write_book(path, w, h, n, done)
+    print(len(done), "positions written to", path)
+
+if __name__ == "__main__":
+    if not len(sys.argv) in [7,8]:
+        print("Usage:\n  {} <book file> <board width> <board height> <tokens to win> <plies> <depth> [workers]".format(sys.argv[0]))
+        sys.exit(1)
+    generate_book(sys.argv[1],
+                  int(sys.argv[2]),
+                  int(sys.argv[3]),
+                  int(sys.argv[4]),
+                  int(sys.argv[5]),
+                  int(sys.argv[6]),
+                  int(sys.argv[7]) if len(sys.argv) == 8 else None)
@@ -0,0 +1,67 @@
+import importlib
+import json
+from collections.abc import Mapping
+from pathlib import Path
+
+###################
+# Player Registry #
+###################
+
+# Find the player names in the submissions directory.
+#
+# The names are cached in a JSON manifest, which is reused as long as it is
+# newer than the directory (adding or removing a submission updates the
+# directory's modification time).
+#
+# PARAM [string] root:     the directory holding one package per player
+# PARAM [string] manifest: the path of the manifest file, or None for no cache
+# RETURN [list of string]: the player names, sorted
+def discover(root="unzipped", manifest=None):
+    """Returns the names of the players in root"""
+    rootp = Path(root)
+    if manifest is not None:
+        mp = Path(manifest)
+        if mp.exists() and mp.stat().st_mtime >= rootp.stat().st_mtime:
+            with mp.open() as f:
+                return json.load(f)
+    names = sorted(d.name for d in rootp.iterdir())
+    if manifest is not None:
+        with Path(manifest).open("w") as f:
+            json.dump(names, f)
+    return names
+
+class LazyPlayers(Mapping):
+    """Mapping from player name to agent that imports each agent on first use"""
+
+    # Class constructor.
+    #
+    # PARAM [list of string] names:    the player names, None to discover them
+    # PARAM [string]         root:     the directory holding the players
+    # PARAM [string]         manifest: the manifest used by discover(), or None
+    def __init__(self, names=None, root="unzipped", manifest=None):
+        """Class constructor"""
+        if names is None:
+            names = discover(root, manifest)
+        # Package of the players, e.g. "unzipped"
+        self.package = Path(root).name
+        self.names = list(names)
+        # Agents imported so far
+        self.agents = {}
+
+    # Get the agent of a player, importing it if needed.
+    #
+    # PARAM [string] name: the player name
+    # RETURN [agent.Agent]: the THE_AGENT object of the player's alpha_beta_agent module
+    def __getitem__(self, name):
+        if name not in self.agents:
+            if name not in self.names:
+                raise KeyError(name)
+            module = importlib.import_module("{}.{}.alpha_beta_agent".format(self.package, name))
+            self.agents[name] = module.THE_AGENT
+        return self.agents[name]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
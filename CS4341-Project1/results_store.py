@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import sys
+import time
+
+#################
+# Results Store #
+#################
+
+# All the games of a tournament in one SQLite file. Each game is committed in
+# its own transaction, so a crash loses at most the games being played, and
+# the database runs in WAL mode so that pool workers can write to it
+# concurrently while standings are being read.
+#
+# Games are keyed by the players' registry names (the keys of PLAYERS), which
+# is what the tournament code looks them up by; the agents' own display
+# names, which may differ, are kept alongside.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    w          INTEGER NOT NULL,
+    h          INTEGER NOT NULL,
+    n          INTEGER NOT NULL,
+    player1    TEXT    NOT NULL,
+    player2    TEXT    NOT NULL,
+    outcome    INTEGER NOT NULL,
+    reason     TEXT    NOT NULL,
+    moves      TEXT    NOT NULL,
+    move_times TEXT    NOT NULL,
+    finished   REAL    NOT NULL,
+    name1      TEXT,
+    name2      TEXT,
+    PRIMARY KEY (w, h, n, player1, player2)
+);
+"""
+
+# Columns added since the first version of the schema
+ADDED_COLUMNS = [("name1", "TEXT"), ("name2", "TEXT")]
+
+class ResultsStore(object):
+    """Game results of a tournament, stored in a SQLite file"""
+
+    # Class constructor.
+    #
+    # PARAM [string] path: the path of the database file
+    def __init__(self, path):
+        """Class constructor"""
+        self.path = path
+        # Wait for other writers instead of failing
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(games)")]
+            for (name, tpe) in ADDED_COLUMNS:
+                if name not in columns:
+                    self.db.execute("ALTER TABLE games ADD COLUMN {} {}".format(name, tpe))
+
+    # Check whether a game has been played already.
+    #
+    # PARAM [int]    w:  the board width
+    # PARAM [int]    h:  the board height
+    # PARAM [int]    n:  the number of tokens to line up to win
+    # PARAM [string] p1: the registry name of Player 1
+    # PARAM [string] p2: the registry name of Player 2
+    # RETURN [bool]: True if the game is in the store
+    def has_game(self, w, h, n, p1, p2):
+        """Returns True if the game between p1 and p2 is in the store"""
+        cur = self.db.execute("SELECT 1 FROM games WHERE w=? AND h=? AND n=? AND player1=? AND player2=?",
+                              (w, h, n, p1, p2))
+        return cur.fetchone() is not None
+
+    # Store the result of a finished game.
+    #
+    # PARAM [game.Game] g:       the game, after timed_go() or logged_go()
+    # PARAM [int]       outcome: 1 for Player 1, 2 for Player 2, 0 for a tie
+    # PARAM [string]    p1:      the registry name of Player 1
+    # PARAM [string]    p2:      the registry name of Player 2
+    def record_game(self, g, outcome, p1, p2):
+        """Stores the moves, move times and outcome of a game"""
+        with self.db:
+            self.db.execute("""INSERT OR REPLACE INTO games
+                               (w, h, n, player1, player2, outcome, reason, moves,
+                                move_times, finished, name1, name2)
+                               VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
+                            (g.board.w, g.board.h, g.board.n,
+                             p1, p2,
+                             outcome, g.end_reason,
+                             ",".join(str(x) for x in g.moves),
+                             json.dumps(g.move_times),
+                             time.time(),
+                             g.players[0].name, g.players[1].name))
+
+    # Get the outcome of a stored game.
+    #
+    # PARAM [int]    w:  the board width
+    # PARAM [int]    h:  the board height
+    # PARAM [int]    n:  the number of tokens to line up to win
+    # PARAM [string] p1: the registry name of Player 1
+    # PARAM [string] p2: the registry name of Player 2
+    # RETURN [int]: 1 for Player 1, 2 for Player 2, 0 for a tie, None if the
+    #               game is not in the store
+    def get_outcome(self, w, h, n, p1, p2):
+        """Returns the outcome of the game between p1 and p2, or None"""
+        cur = self.db.execute("SELECT outcome FROM games WHERE w=? AND h=? AND n=? AND player1=? AND player2=?",
+                              (w, h, n, p1, p2))
+        row = cur.fetchone()
+        return row[0] if row is not None else None
+
+    # Calculate the mean time per move of each player.
+    #
+    # Moves alternate between the players, Player 1 first.
+    #
+    # PARAM [int] w: the board width
+    # PARAM [int] h: the board height
+    # PARAM [int] n: the number of tokens to line up to win
+    # RETURN [dict]: registry name -> mean seconds per move
+    def mean_move_times(self, w, h, n):
+        """Returns the mean time per move of every player in the store"""
+        totals = {}
+        cur = self.db.execute("SELECT player1, player2, move_times FROM games WHERE w=? AND h=? AND n=?",
+                              (w, h, n))
+        for (p1, p2, times) in cur:
+            times = json.loads(times)
+            for (name, mine) in ((p1, times[0::2]), (p2, times[1::2])):
+                (t, k) = totals.get(name, (0.0, 0))
+                totals[name] = (t + sum(mine), k + len(mine))
+        return {name: t / k for (name, (t, k)) in totals.items() if k > 0}
+
+    # Calculate the standings.
+    #
+    # A win is worth 1 point and a loss -1, as in tournament.play_match().
+    #
+    # PARAM [int] w: the board width
+    # PARAM [int] h: the board height
+    # PARAM [int] n: the number of tokens to line up to win
+    # RETURN [list of (int, string)]: (score, registry name), best first
+    def standings(self, w, h, n):
+        """Returns the scores of all players, best first"""
+        cur = self.db.execute("""
+            SELECT name, SUM(points) FROM (
+                SELECT player1 AS name,
+                       CASE outcome WHEN 1 THEN 1 WHEN 2 THEN -1 ELSE 0 END AS points
+                FROM games WHERE w=? AND h=? AND n=?
+                UNION ALL
+                SELECT player2 AS name,
+                       CASE outcome WHEN 2 THEN 1 WHEN 1 THEN -1 ELSE 0 END AS points
+                FROM games WHERE w=? AND h=? AND n=?)
+            GROUP BY name""", (w, h, n, w, h, n))
+        return sorted(((score, name) for (name, score) in cur), reverse=True)
+
+    # Close the database.
+    def close(self):
+        """Closes the database connection"""
+        self.db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage:\n  {} <results db> <board width> <board height> <tokens to win>".format(sys.argv[0]))
+        sys.exit(1)
+    store = ResultsStore(sys.argv[1])
+    for (score, name) in store.standings(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])):
+        print(score, name)
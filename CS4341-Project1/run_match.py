@@ -4,13 +4,14 @@ import sys
 from pathlib import Path
 
 import game
+import results_store
 from players import PLAYERS
 
 #
 # Parse arguments
 #
 if not len(sys.argv) in [8,9]:
-    print("Usage:\n  {} <datadir> <board width> <board height> <tokens to win> <time limit> <player1> <player2> [replay]".format(sys.argv))
+    print("Usage:\n  {} <datadir or results .db> <board width> <board height> <tokens to win> <time limit> <player1> <player2> [replay]".format(sys.argv))
     sys.exit(1)
 
 DATADIR      = sys.argv[1]
@@ -22,6 +23,20 @@ PLAYER1      = sys.argv[6]
 PLAYER2      = sys.argv[7]
 REPLAY       = (len(sys.argv) == 9 and sys.argv[8] == "replay")
 
+#
+# With a results store, check it and record the game there
+#
+if DATADIR.endswith(".db"):
+    store = results_store.ResultsStore(DATADIR)
+    if store.has_game(BOARD_WIDTH, BOARD_HEIGHT, TOKENS, PLAYER1, PLAYER2) and (not REPLAY):
+        print(PLAYER1, PLAYER2, "skipped")
+        sys.exit(0)
+    print(PLAYER1, PLAYER2, "started")
+    g = game.Game(BOARD_WIDTH, BOARD_HEIGHT, TOKENS, PLAYERS[PLAYER1], PLAYERS[PLAYER2])
+    store.record_game(g, g.timed_go(TIME_LIMIT), PLAYER1, PLAYER2)
+    print(PLAYER1, PLAYER2, "done")
+    sys.exit(0)
+
 #
 # Make file name and check if it exists
 #
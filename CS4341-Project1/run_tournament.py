@@ -1,26 +1,14 @@
 #!/usr/bin/env python3
 
-import multiprocessing
-import os
 import sys
-from subprocess import call
 from players import PLAYERS
-
-def run_match(params):
-    datadir = params[0]
-    width   = params[1]
-    height  = params[2]
-    tokens  = params[3]
-    limit   = params[4]
-    p1      = params[5]
-    p2      = params[6]
-    call(["python3", "run_match.py", datadir, str(width), str(height), str(tokens), str(limit), p1, p2])
+import scheduler
 
 #
 # Parse arguments
 #
-if not len(sys.argv) == 6:
-    print("Usage:\n  {} <datadir> <board width> <board height> <tokens to win> <time limit>".format(sys.argv))
+if not len(sys.argv) in [6,7]:
+    print("Usage:\n  {} <datadir or results .db> <board width> <board height> <tokens to win> <time limit> [workers]".format(sys.argv))
     sys.exit(1)
 
 DATADIR      = sys.argv[1]
@@ -28,12 +16,13 @@ BOARD_WIDTH  = int(sys.argv[2])
 BOARD_HEIGHT = int(sys.argv[3])
 TOKENS       = int(sys.argv[4])
 TIME_LIMIT   = int(sys.argv[5])
+WORKERS      = int(sys.argv[6]) if len(sys.argv) == 7 else None
+# A .db file records all games in a results store instead of .dat files
+STORE        = DATADIR if DATADIR.endswith(".db") else None
 
-pool = multiprocessing.Pool()
-matches = []
-for p1 in PLAYERS.keys():
-    for p2 in PLAYERS.keys():
-        if p1 != p2:
-            matches.append((p1,p2))
-
-procs = pool.map(run_match, [(DATADIR, BOARD_WIDTH, BOARD_HEIGHT, TOKENS, TIME_LIMIT, m[0], m[1]) for m in matches])
+#
+# Play all ordered pairs, slowest first; results are printed as soon as each
+# match ends
+#
+for (p1, p2, outcome, path, status) in scheduler.scheduled_tournament(DATADIR, BOARD_WIDTH, BOARD_HEIGHT, TOKENS, TIME_LIMIT, list(PLAYERS.keys()), WORKERS, store=STORE):
+    print(p1, "vs.", p2, ":", status, "-", path)
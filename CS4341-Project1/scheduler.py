@@ -0,0 +1,142 @@
+import tournament_engine
+import results_store
+
+########################
+# Tournament Scheduler #
+########################
+
+# Play the most expensive matches first (longest-processing-time-first), so
+# that a slow agent's games start early instead of stalling the end of the
+# tournament, and the pool hands out one match at a time so no worker idles
+# while others still have a queue. Large fields can also be ranked with a
+# Swiss system, which plays about log2(N) rounds instead of all N*(N-1) pairs.
+
+# Estimate the cost of a match.
+#
+# PARAM [string] p1:      the registry name of Player 1
+# PARAM [string] p2:      the registry name of Player 2
+# PARAM [dict]   times:   registry name -> mean seconds per move
+# PARAM [float]  default: the time per move assumed for unknown players
+# RETURN [float]: the expected seconds per pair of moves
+def expected_cost(p1, p2, times, default):
+    """Returns the expected cost of a match between p1 and p2"""
+    return times.get(p1, default) + times.get(p2, default)
+
+# Order matches longest-expected-first.
+#
+# Unknown players are assumed to be as slow as the slowest known one, so
+# they are not left for last.
+#
+# PARAM [list of tuple] matches: match descriptors (see tournament_engine.play_match)
+# PARAM [dict]          times:   registry name -> mean seconds per move
+# RETURN [list of tuple]: the matches, most expensive first
+def order_matches(matches, times):
+    """Returns the matches sorted by decreasing expected cost"""
+    default = max(times.values()) if times else 0.0
+    return sorted(matches, key=lambda m: expected_cost(m[5], m[6], times, default), reverse=True)
+
+# Play every ordered pair of players, longest-expected-first.
+#
+# Past move times are read from the results store, if any.
+#
+# PARAM [string]         datadir: the directory of the log files
+# PARAM [int]            w:       the board width
+# PARAM [int]            h:       the board height
+# PARAM [int]            n:       the number of tokens to line up to win
+# PARAM [int]            limit:   the time limit for a move in seconds
+# PARAM [list of string] names:   the names of the players
+# PARAM [int]            workers: the number of processes, None for one per core
+# PARAM [string]         store:   the path of a results database, or None
+# RETURN [generator of tuple]: the results of play_match, in completion order
+def scheduled_tournament(datadir, w, h, n, limit, names, workers=None, registry="players", store=None):
+    """Plays all ordered pairs of the given players, slowest matches first"""
+    times = {}
+    if store is not None:
+        db = results_store.ResultsStore(store)
+        times = db.mean_move_times(w, h, n)
+        db.close()
+    matches = [(datadir, w, h, n, limit, p1, p2, False)
+               for p1 in names for p2 in names if p1 != p2]
+    return tournament_engine.run_matches(order_matches(matches, times), workers, registry, store)
+
+# Pair the players for a Swiss round.
+#
+# Players are ranked by score and each is paired with the best-ranked player
+# it hasn't met yet. With an odd number of players, the lowest-ranked player
+# that hasn't had one yet gets a bye.
+#
+# PARAM [list of string] names:  the names of the players
+# PARAM [dict]           scores: player name -> score
+# PARAM [set]            met:    frozensets of the pairs that have played
+# PARAM [set]            byes:   the players that have had a bye
+# RETURN [list of (string, string)]: the pairs for the round
+def swiss_pairs(names, scores, met, byes):
+    """Returns the pairings of a Swiss round"""
+    ranked = sorted(names, key=lambda p: (-scores[p], p))
+    if len(ranked) % 2 == 1:
+        for p in reversed(ranked):
+            if p not in byes:
+                byes.add(p)
+                ranked.remove(p)
+                break
+        else:
+            ranked.pop()
+    pairs = []
+    while ranked:
+        p = ranked.pop(0)
+        # Best-ranked new opponent, or the next one if p has met everyone
+        opp = next((q for q in ranked if frozenset((p, q)) not in met), ranked[0])
+        ranked.remove(opp)
+        pairs.append((p, opp))
+    return pairs
+
+# Run a Swiss tournament.
+#
+# Each round, every pair plays two games with colors swapped, and scores are
+# updated as in tournament.play_match(): +1 for a win, -1 for a loss. Games
+# are recorded in a results store so that rounds can be resumed and
+# standings queried at any time.
+#
+# PARAM [string]         store:   the path of the results database
+# PARAM [int]            w:       the board width
+# PARAM [int]            h:       the board height
+# PARAM [int]            n:       the number of tokens to line up to win
+# PARAM [int]            limit:   the time limit for a move in seconds
+# PARAM [list of string] names:   the names of the players
+# PARAM [int]            rounds:  the maximum number of rounds
+# PARAM [bool]           early_stop: if True, stop as soon as no player can
+#                                    catch up with the leader
+# PARAM [int]            workers: the number of processes, None for one per core
+# RETURN [list of (int, string)]: (score, player name), best first
+def swiss_tournament(store, w, h, n, limit, names, rounds, early_stop=True,
+                     workers=None, registry="players"):
+    """Ranks the players with a Swiss system; returns the standings"""
+    db = results_store.ResultsStore(store)
+    times = db.mean_move_times(w, h, n)
+    scores = {p: 0 for p in names}
+    met = set()
+    byes = set()
+    for r in range(rounds):
+        pairs = swiss_pairs(names, scores, met, byes)
+        matches = []
+        for (p, q) in pairs:
+            met.add(frozenset((p, q)))
+            matches.append((store, w, h, n, limit, p, q, False))
+            matches.append((store, w, h, n, limit, q, p, False))
+        for (p1, p2, outcome, path, status) in tournament_engine.run_matches(order_matches(matches, times), workers, registry, store):
+            if outcome is None:
+                # Played in an earlier, interrupted run
+                outcome = db.get_outcome(w, h, n, p1, p2)
+            if outcome == 1:
+                scores[p1] += 1
+                scores[p2] -= 1
+            elif outcome == 2:
+                scores[p1] -= 1
+                scores[p2] += 1
+        if early_stop and len(names) > 1:
+            # Each remaining round is worth at most 2 points either way
+            (first, second) = sorted(scores.values(), reverse=True)[:2]
+            if first - second > 4 * (rounds - r - 1):
+                break
+    db.close()
+    return sorted(((v, k) for (k, v) in scores.items()), reverse=True)
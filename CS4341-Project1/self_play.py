@@ -0,0 +1,102 @@
+import concurrent.futures
+import math
+import multiprocessing
+import random
+
+import game
+
+##############################
+# Headless Batch Self-Play   #
+##############################
+
+# Agents are built in the worker processes from factories, i.e. callables
+# returning a fresh agent.Agent, such as
+#
+#   functools.partial(alpha_beta_agent.AlphaBetaAgent, "ab", 4)
+#
+# Factories are sent to the pool, so they must be picklable: lambdas won't do.
+# The pool's workers are not daemonic, so the agents may start processes of
+# their own (e.g. AlphaBetaAgent with workers > 1 or ponder=True).
+
+# Play one game between fresh agents.
+#
+# Each game seeds the global random generator, so a game plays out the same
+# whatever worker runs it and whatever the number of workers.
+#
+# PARAM [tuple] task: (factory A, factory B, w, h, n, time limit, seed, A plays first)
+# RETURN [int]: 1 if A won, -1 if B won, 0 for a tie
+def play_one(task):
+    (fa, fb, w, h, n, limit, seed, a_first) = task
+    random.seed(seed)
+    (a, b) = (fa(), fb())
+    try:
+        if a_first:
+            g = game.Game(w, h, n, a, b)
+        else:
+            g = game.Game(w, h, n, b, a)
+        outcome = g.timed_go(limit)
+    finally:
+        # Shut down any processes the agents started
+        for p in (a, b):
+            if hasattr(p, "close"):
+                p.close()
+    if outcome == 0:
+        return 0
+    return 1 if (outcome == 1) == a_first else -1
+
+# Calculate the Wilson score interval of a proportion.
+#
+# PARAM [int]   k: the number of successes
+# PARAM [int]   n: the number of trials
+# PARAM [float] z: the normal quantile of the confidence level
+# RETURN [(float, float)]: the lower and upper bounds
+def wilson_interval(k, n, z=1.96):
+    """Returns the Wilson score interval for k successes out of n trials"""
+    if n == 0:
+        return (0.0, 1.0)
+    p = k / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return (max(0.0, center - half), min(1.0, center + half))
+
+# Play a batch of games between two agent factories.
+#
+# PARAM [callable] factory_a: builds the agent whose results are reported
+# PARAM [callable] factory_b: builds the opponent
+# PARAM [int]      games:     the number of games
+# PARAM [int]      w:         the board width
+# PARAM [int]      h:         the board height
+# PARAM [int]      n:         the number of tokens to line up to win
+# PARAM [float]    limit:     the time limit for a move in seconds
+# PARAM [int]      seed:      the base seed; game i uses a seed derived from it
+# PARAM [int]      workers:   the number of processes, None for one per core
+# PARAM [bool]     alternate: if True, A plays first in even games only,
+#                             otherwise A always plays first
+# PARAM [float]    z:         the normal quantile for the confidence intervals
+# RETURN [dict]: "games", "wins", "losses", "ties", the rates "win_rate",
+#                "loss_rate", "tie_rate", and their intervals "win_ci",
+#                "loss_ci", "tie_ci" (from A's point of view)
+def self_play(factory_a, factory_b, games, w=7, h=6, n=4, limit=float('inf'),
+              seed=0, workers=None, alternate=True, z=1.96):
+    """Plays games between two agent factories and returns A's results"""
+    rng = random.Random(seed)
+    tasks = [(factory_a, factory_b, w, h, n, limit, rng.getrandbits(64),
+              (i % 2 == 0) or not alternate)
+             for i in range(games)]
+    counts = {1: 0, -1: 0, 0: 0}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        # Games are independent; chunks keep the task overhead low
+        chunk = max(1, games // (4 * (workers or multiprocessing.cpu_count())))
+        for r in pool.map(play_one, tasks, chunksize=chunk):
+            counts[r] += 1
+    result = {
+        "games": games,
+        "wins": counts[1],
+        "losses": counts[-1],
+        "ties": counts[0],
+    }
+    for (name, k) in (("win", counts[1]), ("loss", counts[-1]), ("tie", counts[0])):
+        result[name + "_rate"] = k / games if games else 0.0
+        result[name + "_ci"] = wilson_interval(k, games, z)
+    return result
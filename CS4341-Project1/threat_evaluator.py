@@ -0,0 +1,109 @@
+####################################
+# Incremental Threat Count Scoring #
+####################################
+
+class ThreatEvaluator(object):
+    """Keeps per-window token counts and threat scores up to date as tokens come and go"""
+
+    # A window is any line of n cells (horizontal, vertical or diagonal). A
+    # window that holds k tokens of a single player and none of the other is
+    # worth 10^k to that player (k >= 2). Adding or removing a token only
+    # touches the windows through its cell, so the scores are always ready
+    # and evaluating a leaf is a lookup.
+
+    # Class constructor.
+    #
+    # PARAM [int] w: the board width
+    # PARAM [int] h: the board height
+    # PARAM [int] n: the number of tokens to line up to win
+    def __init__(self, w, h, n):
+        """Class constructor"""
+        self.w = w
+        self.h = h
+        self.n = n
+        # Value of a window by number of tokens in it
+        self.weights = [10 ** k if k >= 2 else 0 for k in range(n + 1)]
+        # cell_windows[x * h + y] is the list of windows through (x,y)
+        self.cell_windows = [[] for i in range(w * h)]
+        nwin = 0
+        for (dx, dy) in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            for x in range(w):
+                for y in range(h):
+                    ex = x + (n - 1) * dx
+                    ey = y + (n - 1) * dy
+                    if ex >= w or ey < 0 or ey >= h:
+                        continue
+                    for i in range(n):
+                        self.cell_windows[(x + i*dx) * h + y + i*dy].append(nwin)
+                    nwin = nwin + 1
+        self.num_windows = nwin
+        self.clear()
+
+    # Remove all tokens.
+    def clear(self):
+        """Resets the counts and scores to an empty board"""
+        # counts[p][win] is the number of tokens of player p in window win
+        self.counts = [None, [0] * self.num_windows, [0] * self.num_windows]
+        # scores[p] is the total threat score of player p
+        self.scores = [0, 0, 0]
+
+    # Set the counts and scores from a board.
+    #
+    # PARAM [board.Board] brd: the board state
+    def load(self, brd):
+        """Resets the counts and scores to match the given board"""
+        self.clear()
+        grid = brd.board
+        for x in range(self.w):
+            for y in range(self.h):
+                if grid[y][x] != 0:
+                    self.add(x, y, grid[y][x])
+
+    # Account for a token added at (x,y).
+    #
+    # PARAM [int] x: the x coordinate of the token
+    # PARAM [int] y: the y coordinate of the token
+    # PARAM [int] p: the player owning the token
+    def add(self, x, y, p):
+        """Updates counts and scores for a token of player p added at (x,y)"""
+        q = 2 if p == 1 else 1
+        cp = self.counts[p]
+        cq = self.counts[q]
+        weights = self.weights
+        for win in self.cell_windows[x * self.h + y]:
+            k = cp[win]
+            if cq[win] == 0:
+                # Still a window for p only, with one more token
+                self.scores[p] += weights[k + 1] - weights[k]
+            elif k == 0:
+                # Window of q now blocked
+                self.scores[q] -= weights[cq[win]]
+            cp[win] = k + 1
+
+    # Account for a token removed from (x,y).
+    #
+    # PARAM [int] x: the x coordinate of the token
+    # PARAM [int] y: the y coordinate of the token
+    # PARAM [int] p: the player owning the token
+    def remove(self, x, y, p):
+        """Updates counts and scores for a token of player p removed from (x,y)"""
+        q = 2 if p == 1 else 1
+        cp = self.counts[p]
+        cq = self.counts[q]
+        weights = self.weights
+        for win in self.cell_windows[x * self.h + y]:
+            k = cp[win] - 1
+            cp[win] = k
+            if cq[win] == 0:
+                self.scores[p] -= weights[k + 1] - weights[k]
+            elif k == 0:
+                # Window of q open again
+                self.scores[q] += weights[cq[win]]
+
+    # Score a position from the point of view of a player.
+    #
+    # PARAM [int] p: the player
+    # RETURN [int]: the threat score of p minus that of the opponent
+    def score(self, p):
+        """Returns the threat score of player p minus that of the opponent"""
+        return self.scores[p] - self.scores[2 if p == 1 else 1]
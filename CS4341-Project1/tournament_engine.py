@@ -0,0 +1,164 @@
+import concurrent.futures
+import copy
+import importlib
+from pathlib import Path
+
+import game
+import results_store
+
+#####################
+# Tournament Engine #
+#####################
+
+# Matches are played by long-lived pool processes that import the player
+# registry once, so a match costs only the game itself rather than a fresh
+# interpreter and a re-import of every submission. The pool is a
+# ProcessPoolExecutor rather than a multiprocessing.Pool: its workers are not
+# daemonic, so agents can start processes of their own (parallel root
+# search, pondering) as they could when each match had its own interpreter.
+
+# Players loaded in this worker process
+PLAYERS = None
+# Results store of this worker process, None to use .dat log files
+STORE = None
+
+# Pool initializer: load the player registry and open the results store.
+#
+# PARAM [string] registry: the name of the module defining PLAYERS
+# PARAM [string] store:    the path of the results database, or None
+def init_worker(registry, store=None):
+    global PLAYERS
+    global STORE
+    PLAYERS = importlib.import_module(registry).PLAYERS
+    if store is not None:
+        # Each process needs its own connection
+        STORE = results_store.ResultsStore(store)
+
+# Make the path of the log file of a match.
+#
+# PARAM [string] datadir: the directory of the log files
+# PARAM [int]    w:       the board width
+# PARAM [int]    h:       the board height
+# PARAM [int]    n:       the number of tokens to line up to win
+# PARAM [string] p1:      the name of Player 1
+# PARAM [string] p2:      the name of Player 2
+# RETURN [string]: the path of the log file
+def match_file(datadir, w, h, n, p1, p2):
+    """Returns the path of the log file of a match"""
+    return "{}/{}_{}_{}_{}_{}.dat".format(datadir, w, h, n, p1, p2)
+
+# Make a game between fresh copies of two players.
+#
+# The registry agents are only templates: each match gets its own copies, so
+# no state (transposition tables, search trees, a submission's own memos)
+# carries over from the matches the worker played before.
+#
+# PARAM [int]    w:  the board width
+# PARAM [int]    h:  the board height
+# PARAM [int]    n:  the number of tokens to line up to win
+# PARAM [string] p1: the name of Player 1
+# PARAM [string] p2: the name of Player 2
+# RETURN [game.Game]: the game, ready to be played
+def new_game(w, h, n, p1, p2):
+    return game.Game(w, h, n, copy.deepcopy(PLAYERS[p1]), copy.deepcopy(PLAYERS[p2]))
+
+# Shut down any processes the players of a game started.
+#
+# PARAM [game.Game] g: the game, or None if it couldn't be made
+def close_players(g):
+    if g is None:
+        return
+    for p in g.players:
+        if hasattr(p, "close"):
+            p.close()
+
+# Play a match in a worker process.
+#
+# If the worker has a results store, the game is recorded there instead of
+# in a log file.
+#
+# PARAM [tuple] match: (datadir, w, h, n, time limit, player 1, player 2, replay)
+# RETURN [tuple]: (player 1, player 2, outcome, log file path, status), where
+#                 outcome is None unless status is "done"
+def play_match(match):
+    if STORE is not None:
+        return play_stored_match(match)
+    (datadir, w, h, n, limit, p1, p2, replay) = match
+    path = match_file(datadir, w, h, n, p1, p2)
+    if Path(path).exists() and not replay:
+        return (p1, p2, None, path, "skipped")
+    g = None
+    try:
+        g = new_game(w, h, n, p1, p2)
+        outcome = g.logged_go(path, limit)
+    except BaseException as e:
+        # A submission calling sys.exit() must not take the worker down with
+        # it: the match would be lost and run_matches would wait forever.
+        # Don't leave a partial log behind, so the match is played again
+        # next time
+        Path(path).unlink(missing_ok=True)
+        return (p1, p2, None, path, "failed: {!r}".format(e))
+    finally:
+        close_players(g)
+    return (p1, p2, outcome, path, "done")
+
+# Play a match and record it in the worker's results store.
+#
+# PARAM [tuple] match: (datadir, w, h, n, time limit, player 1, player 2, replay)
+# RETURN [tuple]: (player 1, player 2, outcome, store path, status)
+def play_stored_match(match):
+    (datadir, w, h, n, limit, p1, p2, replay) = match
+    if STORE.has_game(w, h, n, p1, p2) and not replay:
+        return (p1, p2, None, STORE.path, "skipped")
+    g = None
+    try:
+        g = new_game(w, h, n, p1, p2)
+        outcome = g.timed_go(limit)
+    except BaseException as e:
+        # See play_match
+        return (p1, p2, None, STORE.path, "failed: {!r}".format(e))
+    finally:
+        close_players(g)
+    STORE.record_game(g, outcome, p1, p2)
+    return (p1, p2, outcome, STORE.path, "done")
+
+# Play a list of matches, yielding the results as they finish.
+#
+# PARAM [list of tuple] matches:  the match descriptors (see play_match)
+# PARAM [int]           workers:  the number of processes, None for one per core
+# PARAM [string]        registry: the name of the module defining PLAYERS
+# PARAM [string]        store:    the path of a results database to record
+#                                 the games in, None for .dat log files
+# RETURN [generator of tuple]: the results of play_match, in completion order
+def run_matches(matches, workers=None, registry="players", store=None):
+    """Plays the given matches in a pool of worker processes"""
+    if store is not None:
+        # Create the schema once, before the workers race to do it
+        results_store.ResultsStore(store).close()
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_worker,
+                                                initargs=(registry, store)) as pool:
+        futures = [pool.submit(play_match, m) for m in matches]
+        try:
+            for f in concurrent.futures.as_completed(futures):
+                yield f.result()
+        finally:
+            # Don't start the rest if the caller stops early
+            for f in futures:
+                f.cancel()
+
+# Play every ordered pair of players.
+#
+# PARAM [string]         datadir: the directory of the log files
+# PARAM [int]            w:       the board width
+# PARAM [int]            h:       the board height
+# PARAM [int]            n:       the number of tokens to line up to win
+# PARAM [int]            limit:   the time limit for a move in seconds
+# PARAM [list of string] names:   the names of the players
+# PARAM [int]            workers: the number of processes, None for one per core
+# PARAM [string]         store:   the path of a results database, or None
+# RETURN [generator of tuple]: the results of play_match, in completion order
+def run_tournament(datadir, w, h, n, limit, names, workers=None, registry="players", store=None):
+    """Plays all ordered pairs of the given players"""
+    matches = [(datadir, w, h, n, limit, p1, p2, False)
+               for p1 in names for p2 in names if p1 != p2]
+    return run_matches(matches, workers, registry, store)
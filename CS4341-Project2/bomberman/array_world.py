@@ -0,0 +1,364 @@
+from array import array
+from math import copysign
+from sensed_world import SensedWorld
+
+##################
+# Entity records #
+##################
+
+# Lightweight copies of the entities, used by ArrayWorld. They behave like
+# the entity classes as far as the world update and the AI code are
+# concerned, but keep their fields in __slots__.
+
+def __sign__(x):
+    if x == 0.0:
+        return 0
+    return int(copysign(1, x))
+
+class BombRecord(object):
+    """Bomb record"""
+
+    __slots__ = ('x', 'y', 'timer', 'owner')
+
+    def __init__(self, x, y, timer, owner):
+        """Class constructor"""
+        self.x = x
+        self.y = y
+        self.timer = timer
+        self.owner = owner
+
+    def tick(self):
+        """Performs a clock tick"""
+        self.timer = self.timer - 1
+
+    def expired(self):
+        return self.timer < 0
+
+    ###################
+    # Private methods #
+    ###################
+
+    def __eq__(self, other):
+        return ((self.x, self.y, self.timer) == (other.x, other.y, other.timer) and
+                self.owner == other.owner)
+
+    def __ne__(self, other):
+        return not(self == other)
+
+class ExplosionRecord(BombRecord):
+    """Explosion record"""
+
+    __slots__ = ()
+
+class MovableRecord(object):
+    """Record of an entity with a name and a direction"""
+
+    __slots__ = ('name', 'avatar', 'x', 'y', 'dx', 'dy')
+
+    def __init__(self, name, avatar, x, y, dx=0, dy=0):
+        """Class constructor"""
+        self.name = name
+        self.avatar = avatar
+        self.x = x
+        self.y = y
+        self.dx = dx
+        self.dy = dy
+
+    def move(self, dx, dy):
+        """Move entity"""
+        self.dx = __sign__(dx)
+        self.dy = __sign__(dy)
+
+    def nextpos(self):
+        """Returns the next position of this entity"""
+        return (self.x + self.dx, self.y + self.dy)
+
+    def do(self, wrld):
+        """Pick an action for the entity given the world state"""
+        pass
+
+    ###################
+    # Private methods #
+    ###################
+
+    def __hash__(self):
+        return hash((self.name, self.x, self.y))
+
+    def __eq__(self, other):
+        return (self.x, self.y, self.dx, self.dy) == (other.x, other.y, other.dx, other.dy)
+
+    def __ne__(self, other):
+        return not(self == other)
+
+class MonsterRecord(MovableRecord):
+    """Monster record"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_monster(cls, monster):
+        """Clone a monster entity or record"""
+        return cls(monster.name, monster.avatar, monster.x, monster.y, monster.dx, monster.dy)
+
+class CharacterRecord(MovableRecord):
+    """Character record"""
+
+    __slots__ = ('maybe_place_bomb', 'tiles')
+
+    def __init__(self, name, avatar, x, y, dx=0, dy=0):
+        """Class constructor"""
+        super().__init__(name, avatar, x, y, dx, dy)
+        # Whether this character wants to place a bomb
+        self.maybe_place_bomb = False
+        # Debugging elements
+        self.tiles = {}
+
+    def place_bomb(self):
+        """Attempts to place a bomb"""
+        self.maybe_place_bomb = True
+
+    def set_cell_color(self, x, y, color):
+        """Sets the cell color at (x,y)"""
+        self.tiles[(x,y)] = color
+
+    def done(self, wrld):
+        pass
+
+    @classmethod
+    def from_character(cls, character):
+        """Clone a character entity or record"""
+        new = cls(character.name, character.avatar, character.x, character.y, character.dx, character.dy)
+        new.maybe_place_bomb = character.maybe_place_bomb
+        return new
+
+    ###################
+    # Private methods #
+    ###################
+
+    def __hash__(self):
+        return hash((self.name, self.x, self.y))
+
+    def __eq__(self, other):
+        return (self.maybe_place_bomb == other.maybe_place_bomb and
+                super().__eq__(other))
+
+###############
+# Array world #
+###############
+
+class ArrayWorld(SensedWorld):
+    """World state with flat per-cell layers for fast queries"""
+
+    # Cell (x,y) is at index x + y * width, like World.index(). The layers
+    # are:
+    #
+    #   walls            1 for a wall, 0 otherwise (bytearray, shared with
+    #                    the state it was copied from until a wall is destroyed)
+    #   bomb_timers      bomb timer + 1, 0 for no bomb (array of int)
+    #   expl_timers      explosion timer + 1, 0 for no explosion (array of int)
+    #   monster_counts   number of monsters (bytearray)
+    #   character_counts number of characters (bytearray)
+    #
+    # The entity dictionaries of World are kept too, since the step code and
+    # the AI code iterate them. The timer and count layers are built by
+    # from_world() and at the end of each step; until then, and after any
+    # other change to the entities, the queries fall back to the dictionaries.
+
+    def __init__(self):
+        """Class constructor"""
+        self.w = 0
+        self.h = 0
+        self.walls = bytearray()
+        self.walls_shared = False
+        super().__init__()
+        self.bomb_timers = array('i')
+        self.expl_timers = array('i')
+        self.monster_counts = bytearray()
+        self.character_counts = bytearray()
+        # True if the timer and count layers match the entity dictionaries
+        self.indexed = False
+
+    @property
+    def grid(self):
+        """Column-major grid of walls, built on demand"""
+        return [[self.walls[x + y * self.w] == 1 for y in range(self.h)] for x in range(self.w)]
+
+    @grid.setter
+    def grid(self, grid):
+        """Loads a column-major grid of walls"""
+        if grid is None:
+            return
+        self.w = len(grid)
+        self.h = len(grid[0])
+        self.walls = bytearray(self.w * self.h)
+        self.walls_shared = False
+        # Column x is every w-th cell starting at x
+        for x in range(self.w):
+            self.walls[x::self.w] = bytes(grid[x])
+
+    @classmethod
+    def from_world(cls, wrld):
+        """Create a new world state from an existing state"""
+        new = super().from_world(wrld)
+        new.index_layers()
+        return new
+
+    def width(self):
+        """Returns the world width"""
+        return self.w
+
+    def height(self):
+        """Returns the world height"""
+        return self.h
+
+    def empty_at(self, x, y):
+        """Returns True if there is nothing at (x,y)"""
+        if not self.indexed:
+            return super().empty_at(x, y)
+        i = x + y * self.w
+        return not (self.exitcell == (x,y) or
+                    self.walls[i] or
+                    self.bomb_timers[i] or
+                    self.expl_timers[i] or
+                    self.monster_counts[i] or
+                    self.character_counts[i])
+
+    def wall_at(self, x, y):
+        """Returns True if there is a wall at (x,y)"""
+        return self.walls[x + y * self.w] == 1
+
+    def bomb_at(self, x, y):
+        """Returns the bomb at (x,y) or None"""
+        i = x + y * self.w
+        if self.indexed and not self.bomb_timers[i]:
+            return None
+        return self.bombs.get(i)
+
+    def explosion_at(self, x, y):
+        """Returns the explosion at (x,y) or None"""
+        i = x + y * self.w
+        if self.indexed and not self.expl_timers[i]:
+            return None
+        return self.explosions.get(i)
+
+    def monsters_at(self, x, y):
+        """Returns the monsters at (x,y) or None"""
+        i = x + y * self.w
+        if self.indexed and not self.monster_counts[i]:
+            return None
+        return self.monsters.get(i)
+
+    def characters_at(self, x, y):
+        """Returns the characters at (x,y) or None"""
+        i = x + y * self.w
+        if self.indexed and not self.character_counts[i]:
+            return None
+        return self.characters.get(i)
+
+    def next(self):
+        """Returns a new world state, along with the events that occurred"""
+        # The step changes the dictionaries behind the layers' back, so the
+        # layers are only built once it is over
+        new = self.snapshot(self)
+        new.time = new.time - 1
+        new.update_explosions()
+        new.events = new.update_bombs() + new.update_monsters() + new.update_characters()
+        new.update_scores()
+        new.manage_events()
+        new.index_layers()
+        return (new, new.events)
+
+    ###################
+    # Private methods #
+    ###################
+
+    @classmethod
+    def copy_state(cls, wrld):
+        """Copy everything but the events; returns the new state and the old-to-new monster and character mappings"""
+        new = cls()
+        new.bomb_time     = wrld.bomb_time
+        new.expl_duration = wrld.expl_duration
+        new.expl_range    = wrld.expl_range
+        new.exitcell      = wrld.exitcell
+        new.time          = wrld.time
+        # Share the walls of another array world, convert any other grid
+        if isinstance(wrld, ArrayWorld):
+            new.w = wrld.w
+            new.h = wrld.h
+            new.walls = wrld.walls
+            new.walls_shared = True
+            wrld.walls_shared = True
+        else:
+            new.grid = wrld.grid
+        # Copy monsters
+        mmapping = {}
+        for k, omonsters in wrld.monsters.items():
+            nmonsters = []
+            for m in omonsters:
+                nm = MonsterRecord.from_monster(m)
+                nmonsters.append(nm)
+                mmapping[m] = nm
+            new.monsters[k] = nmonsters
+        # Copy characters and build a mapping between old and new
+        cmapping = {}
+        for k, ocharacters in wrld.characters.items():
+            ncharacters = []
+            for oc in ocharacters:
+                nc = CharacterRecord.from_character(oc)
+                ncharacters.append(nc)
+                cmapping[oc] = nc
+            new.characters[k] = ncharacters
+        # Copy bombs
+        for k, ob in wrld.bombs.items():
+            c = cmapping.get(ob.owner, ob.owner)
+            new.bombs[k] = BombRecord(ob.x, ob.y, ob.timer, c)
+        # Copy explosions
+        for k, oe in wrld.explosions.items():
+            c = cmapping.get(oe.owner)
+            if c:
+                new.explosions[k] = ExplosionRecord(oe.x, oe.y, oe.timer, c)
+        # Copy scores
+        new.scores = dict(wrld.scores)
+        return (new, mmapping, cmapping)
+
+    def index_layers(self):
+        """Rebuilds the timer and count layers from the entity dictionaries"""
+        n = self.w * self.h
+        self.bomb_timers = array('i', [0]) * n
+        for i, b in self.bombs.items():
+            self.bomb_timers[i] = b.timer + 1
+        self.expl_timers = array('i', [0]) * n
+        for i, e in self.explosions.items():
+            self.expl_timers[i] = e.timer + 1
+        self.monster_counts = bytearray(n)
+        for i, mlist in self.monsters.items():
+            self.monster_counts[i] = len(mlist)
+        self.character_counts = bytearray(n)
+        for i, clist in self.characters.items():
+            self.character_counts[i] = len(clist)
+        self.indexed = True
+
+    def index(self, x, y):
+        """Returns an index used in internal dictionaries"""
+        return x + y * self.w
+
+    def set_wall(self, x, y, wall):
+        """Sets or clears the wall at (x,y), copying the walls first if shared"""
+        if self.walls_shared:
+            self.walls = bytearray(self.walls)
+            self.walls_shared = False
+        self.walls[x + y * self.w] = 1 if wall else 0
+
+    def add_explosion(self, x, y, bomb):
+        """Adds an explosion to the world state"""
+        self.indexed = False
+        self.explosions[self.index(x,y)] = ExplosionRecord(x, y, self.expl_duration, bomb.owner)
+
+    def add_bomb(self, x, y, character):
+        """Adds a bomb to the world state"""
+        self.indexed = False
+        self.bombs[self.index(x,y)] = BombRecord(x, y, self.bomb_time, character)
+
+    def remove_character(self, character):
+        self.indexed = False
+        super().remove_character(character)
@@ -0,0 +1,106 @@
+from real_world import RealWorld
+from events import Event
+import collections
+
+# Outcome of a headless run
+#
+# outcome [dict]: character name -> "exit", "killed_by_monster",
+#                 "killed_by_bomb" or "alive" (still in the world at the end)
+# scores  [dict]: character name -> final score
+# steps   [int]:  number of world steps played
+# events  [list]: (step, event type, character name, other name or None)
+#                 for each event, in order
+Result = collections.namedtuple("Result", ["outcome", "scores", "steps", "events"])
+
+class Engine:
+    """Game engine without display"""
+
+    def __init__(self, width, height, max_time, bomb_time, expl_duration, expl_range):
+        self.world = RealWorld.from_params(width, height, max_time, bomb_time, expl_duration, expl_range)
+
+    @classmethod
+    def fromfile(cls, fname, *args):
+        """Create a game from a map file; extra arguments go to the constructor"""
+        with open(fname, 'r') as fd:
+            # First lines are parameters
+            max_time = int(fd.readline().split()[1])
+            bomb_time = int(fd.readline().split()[1])
+            expl_duration = int(fd.readline().split()[1])
+            expl_range = int(fd.readline().split()[1])
+            # Next line is top border, use it for width
+            width = len(fd.readline()) - 3
+            # Count the rows
+            startpos = fd.tell()
+            height = 0
+            row = fd.readline()
+            while row and row[0] == '|':
+                height = height + 1
+                if len(row) != width + 3:
+                    raise RuntimeError("Row", height, "is not", width, "characters long")
+                row = fd.readline()
+            # Create empty world
+            gm = cls(width, height, max_time, bomb_time, expl_duration, expl_range, *args)
+            # Now parse the data in the world
+            fd.seek(startpos)
+            for y in range(0, height):
+                ln = fd.readline()
+                for x in range(0, width):
+                    if ln[x+1] == 'E':
+                        if not gm.world.exitcell:
+                            gm.world.add_exit(x,y)
+                        else:
+                            raise RuntimeError("There can be only one exit cell, first one found at", x, y)
+                    elif ln[x+1] == 'W':
+                        gm.world.add_wall(x,y)
+            # All done
+            return gm
+
+    def run(self):
+        """Plays the game to the end without display or waits; returns a Result"""
+        outcome = {}
+        for k,clist in self.world.characters.items():
+            for c in clist:
+                outcome[c.name] = "alive"
+        events = []
+        steps = 0
+        # Same sequence as Game.go(): the first step happens before any decision
+        while not self.done():
+            (self.world, self.events) = self.world.next()
+            steps = steps + 1
+            for e in self.events:
+                other = e.other.name if e.other is not None else None
+                events.append((steps, e.tpe, e.character.name, other))
+                if e.tpe == Event.BOMB_HIT_CHARACTER:
+                    outcome[e.other.name] = "killed_by_bomb"
+                elif e.tpe == Event.CHARACTER_KILLED_BY_MONSTER:
+                    outcome[e.character.name] = "killed_by_monster"
+                elif e.tpe == Event.CHARACTER_FOUND_EXIT:
+                    outcome[e.character.name] = "exit"
+            self.world.next_decisions()
+        return Result(outcome, dict(self.world.scores), steps, events)
+
+    ###################
+    # Private methods #
+    ###################
+
+    def done(self):
+        # Time's up
+        if self.world.time <= 0:
+            return True
+        # No more characters left
+        if not self.world.characters:
+            return True
+        # Last man standing
+        if not self.world.exitcell:
+            count = 0
+            for k,clist in self.world.characters.items():
+                count = count + len(clist)
+            if count == 0:
+                return True
+        return False
+
+    def add_monster(self, m):
+        self.world.add_monster(m)
+
+    def add_character(self, c):
+        self.world.add_character(c)
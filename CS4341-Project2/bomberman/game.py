@@ -1,52 +1,19 @@
-from real_world import RealWorld
-from events import Event
+from engine import Engine
 import colorama
 import pygame
 import math
 
-class Game:
+class Game(Engine):
     """Game class"""
 
     def __init__(self, width, height, max_time, bomb_time, expl_duration, expl_range, sprite_dir="../../bomberman/sprites/"):
-        self.world = RealWorld.from_params(width, height, max_time, bomb_time, expl_duration, expl_range)
+        super().__init__(width, height, max_time, bomb_time, expl_duration, expl_range)
         self.sprite_dir = sprite_dir
         self.load_gui(width, height)
 
     @classmethod
     def fromfile(cls, fname, sprite_dir="../../bomberman/sprites/"):
-        with open(fname, 'r') as fd:
-            # First lines are parameters
-            max_time = int(fd.readline().split()[1])
-            bomb_time = int(fd.readline().split()[1])
-            expl_duration = int(fd.readline().split()[1])
-            expl_range = int(fd.readline().split()[1])
-            # Next line is top border, use it for width
-            width = len(fd.readline()) - 3
-            # Count the rows
-            startpos = fd.tell()
-            height = 0
-            row = fd.readline()
-            while row and row[0] == '|':
-                height = height + 1
-                if len(row) != width + 3:
-                    raise RuntimeError("Row", height, "is not", width, "characters long")
-                row = fd.readline()
-            # Create empty world
-            gm = cls(width, height, max_time, bomb_time, expl_duration, expl_range, sprite_dir)
-            # Now parse the data in the world
-            fd.seek(startpos)
-            for y in range(0, height):
-                ln = fd.readline()
-                for x in range(0, width):
-                    if ln[x+1] == 'E':
-                        if not gm.world.exitcell:
-                            gm.world.add_exit(x,y)
-                        else:
-                            raise RuntimeError("There can be only one exit cell, first one found at", x, y)
-                    elif ln[x+1] == 'W':
-                        gm.world.add_wall(x,y)
-            # All done
-            return gm
+        return super().fromfile(fname, sprite_dir)
 
     def load_gui(self, board_width, board_height):
         pygame.init()
@@ -125,23 +92,4 @@ class Game:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return True
-        # Time's up
-        if self.world.time <= 0:
-            return True
-        # No more characters left
-        if not self.world.characters:
-            return True
-        # Last man standing
-        if not self.world.exitcell:
-            count = 0
-            for k,clist in self.world.characters.items():
-                count = count + len(clist)
-            if count == 0:
-                return True
-        return False
-
-    def add_monster(self, m):
-        self.world.add_monster(m)
-
-    def add_character(self, c):
-        self.world.add_character(c)
\ No newline at end of file
+        return super().done()
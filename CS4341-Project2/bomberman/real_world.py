@@ -5,13 +5,16 @@ from events import Event
 class RealWorld(World):
     """The real world state"""
 
+    # Class of the world states handed to the monsters and characters
+    sensed_class = SensedWorld
+
     def add_exit(self, x, y):
         """Adds an exit cell at (x,y)"""
         self.exitcell = (x,y)
 
     def add_wall(self, x, y):
         """Adds a wall cell at (x,y)"""
-        self.grid[x][y] = True
+        self.set_wall(x, y, True)
 
     def add_monster(self, m):
         """Adds the given monster to the world"""
@@ -44,15 +47,15 @@ class RealWorld(World):
         for i, elist in entities.items():
             for e in elist:
                 # Call AI
-                e.do(SensedWorld.from_world(self))
+                e.do(self.sensed_class.from_world(self))
 
     def manage_events(self):
         for e in self.events:
             if e.tpe == Event.BOMB_HIT_CHARACTER:
-                e.other.done(SensedWorld.from_world(self))
+                e.other.done(self.sensed_class.from_world(self))
             elif e.tpe == Event.CHARACTER_KILLED_BY_MONSTER:
                 self.remove_character(e.character)
-                e.character.done(SensedWorld.from_world(self))
+                e.character.done(self.sensed_class.from_world(self))
             elif e.tpe == Event.CHARACTER_FOUND_EXIT:
-                e.character.done(SensedWorld.from_world(self))
+                e.character.done(self.sensed_class.from_world(self))
         
@@ -8,14 +8,69 @@ class SensedWorld(World):
     @classmethod
     def from_world(cls, wrld):
         """Create a new world state from an existing state"""
+        (new, mmapping, cmapping) = cls.copy_state(wrld)
+        # Copy events
+        for e in wrld.events:
+            # Create a new event
+            # Tricky: if the character related to the event has died, duplicate the original character
+            c = cmapping.get(e.character)
+            if c is None:
+                c = CharacterEntity.from_character(e.character)
+            newev = Event(e.tpe, c)
+            # Manage other attribute
+            if e.tpe == Event.BOMB_HIT_MONSTER:
+                newev.other = MonsterEntity.from_monster(e.other)
+            elif e.tpe == Event.BOMB_HIT_CHARACTER:
+                newev.other = CharacterEntity.from_character(e.other)
+            elif e.tpe == Event.CHARACTER_KILLED_BY_MONSTER:
+                m = mmapping.get(e.other)
+                if m is None:
+                    m = MonsterEntity.from_monster(e.other)
+                newev.other = m
+            new.events.append(newev)
+        return new
+
+    @classmethod
+    def snapshot(cls, wrld):
+        """Create a new world state from an existing state, without its events"""
+        return cls.copy_state(wrld)[0]
+
+    def me(self, character):
+        for k,clist in self.characters.items():
+            for c in clist:
+                if c.name == character.name:
+                    return c
+
+    def next(self):
+        """Returns a new world state, along with the events that occurred"""
+        # The events of this state are replaced by the step's, so don't copy them
+        new = self.snapshot(self)
+        new.time = new.time - 1
+        new.update_explosions()
+        new.events = new.update_bombs() + new.update_monsters() + new.update_characters()
+        new.update_scores()
+        new.manage_events()
+        return (new, new.events)
+
+    ###################
+    # Private methods #
+    ###################
+
+    @classmethod
+    def copy_state(cls, wrld):
+        """Copy everything but the events; returns the new state and the old-to-new monster and character mappings"""
+        # The wall grid is shared with wrld until either of them destroys a
+        # wall; the entities are copied, since a step moves or ticks them all
         new = cls()
         new.bomb_time     = wrld.bomb_time
         new.expl_duration = wrld.expl_duration
         new.expl_range    = wrld.expl_range
         new.exitcell      = wrld.exitcell
         new.time          = wrld.time
-        # Copy grid
-        new.grid          = [[wrld.wall_at(x,y) for y in range(wrld.height())] for x in range(wrld.width())]
+        # Share grid
+        new.grid          = wrld.grid
+        new.grid_shared   = True
+        wrld.grid_shared  = True
         # Copy monsters
         mmapping = {}
         for k, omonsters in wrld.monsters.items():
@@ -53,43 +108,9 @@ class SensedWorld(World):
             c = cmapping.get(oe.owner)
             if c:
                 new.explosions[k] = ExplosionEntity(oe.x, oe.y, oe.timer, c)
-        # Copy events
-        for e in wrld.events:
-            # Create a new event
-            # Tricky: if the character related to the event has died, duplicate the original character
-            newev = Event(e.tpe, cmapping.get(e.character, CharacterEntity.from_character(e.character)))
-            # Manage other attribute
-            if e.tpe == Event.BOMB_HIT_MONSTER:
-                newev.other = MonsterEntity.from_monster(e.other)
-            elif e.tpe == Event.BOMB_HIT_CHARACTER:
-                newev.other = CharacterEntity.from_character(e.other)
-            elif e.tpe == Event.CHARACTER_KILLED_BY_MONSTER:
-                newev.other = mmapping.get(e.other, MonsterEntity.from_monster(e.other))
-            new.events.append(newev)
         # Copy scores
-        for name,score in wrld.scores.items():
-            new.scores[name] = score
-        return new
-
-    def me(self, character):
-        for k,clist in self.characters.items():
-            for c in clist:
-                if c.name == character.name:
-                    return c
-
-    def next(self):
-        """Returns a new world state, along with the events that occurred"""
-        new = SensedWorld.from_world(self)
-        new.time = new.time - 1
-        new.update_explosions()
-        new.events = new.update_bombs() + new.update_monsters() + new.update_characters()
-        new.update_scores()
-        new.manage_events()
-        return (new, new.events)
-
-    ###################
-    # Private methods #
-    ###################
+        new.scores = dict(wrld.scores)
+        return (new, mmapping, cmapping)
 
     def aientity_do(self, entities):
         """Call AI to get actions for next step"""
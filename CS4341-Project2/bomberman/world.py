@@ -19,6 +19,9 @@ class World:
         self.time = -1
         # Grid of cell types
         self.grid       = None
+        # True if the grid may be shared with another world state, in which
+        # case it is copied before being modified
+        self.grid_shared = False
         # List of dynamic elements
         self.bombs      = {}
         self.explosions = {}
@@ -140,6 +143,13 @@ class World:
         """Adds an explosion to the world state"""
         self.explosions[self.index(x,y)] = ExplosionEntity(x, y, self.expl_duration, bomb.owner)
 
+    def set_wall(self, x, y, wall):
+        """Sets or clears the wall at (x,y), copying the grid first if shared"""
+        if self.grid_shared:
+            self.grid = [col[:] for col in self.grid]
+            self.grid_shared = False
+        self.grid[x][y] = wall
+
     def add_bomb(self, x, y, character):
         """Adds a bomb to the world state"""
         self.bombs[self.index(x,y)] = BombEntity(x, y, self.bomb_time, character)
@@ -297,7 +307,8 @@ class World:
             e.tick()
             if e.expired():
                 todelete.append(i)
-                self.grid[e.x][e.y] = False
+                if self.wall_at(e.x, e.y):
+                    self.set_wall(e.x, e.y, False)
         for i in todelete:
             del self.explosions[i]
 
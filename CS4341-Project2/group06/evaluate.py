@@ -0,0 +1,201 @@
+'''
+Monte Carlo evaluation of the scenario variants.
+
+Plays many seeded games of each variant, without display, across a pool of
+processes. Each game is appended to a results file (one JSON object per
+line) as soon as it ends, so an interrupted sweep picks up where it left
+off, and the results are summarized per variant at the end.
+
+Usage:
+    python evaluate.py <results file> <games per variant> [workers] [variant ...]
+
+Variants are named like scenario1/variant3; by default all ten are played.
+'''
+import sys
+import os
+import json
+import time
+import random
+import importlib
+import statistics
+import multiprocessing
+
+GROUP06 = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(GROUP06, '..', 'bomberman'))
+sys.path.insert(1, GROUP06)
+
+from engine import Engine
+
+# Setup of each variant, as in scenarioN/variantM.py:
+# (character (module, class, arguments), [monster (module, class, arguments)])
+STUPID = ('monsters.stupid_monster', 'StupidMonster', ("stupid", "S", 3, 9))
+SELFPRESERVING = ('monsters.selfpreserving_monster', 'SelfPreservingMonster', ("selfpreserving", "S", 3, 9, 1))
+AGGRESSIVE = ('monsters.selfpreserving_monster', 'SelfPreservingMonster', ("aggressive", "A", 3, 13, 2))
+STUPID_TOP = ('monsters.stupid_monster', 'StupidMonster', ("stupid", "S", 3, 5))
+
+def character(scenario, expectimax_range):
+    '''
+    Returns the specification of our character in a scenario
+
+            Parameters:
+                    scenario (int): The scenario number
+                    expectimax_range (int): The monster distance to invoke expectimax
+
+            Returns:
+                    spec (module, class, arguments): The character specification
+    '''
+    module = 'character_scenario_one' if scenario == 1 else 'character_scenario_two'
+    cls = 'CharacterScenarioOne' if scenario == 1 else 'CharacterScenarioTwo'
+    return (module, cls, ("me", "C", 0, 0, expectimax_range))
+
+VARIANTS = {
+    'scenario1/variant1': (character(1, 0), []),
+    'scenario1/variant2': (character(1, 2), [STUPID]),
+    'scenario1/variant3': (character(1, 4), [SELFPRESERVING]),
+    'scenario1/variant4': (character(1, 5), [AGGRESSIVE]),
+    'scenario1/variant5': (character(1, 5), [STUPID_TOP, AGGRESSIVE]),
+    'scenario2/variant1': (character(2, 0), []),
+    'scenario2/variant2': (character(2, 3), [STUPID]),
+    'scenario2/variant3': (character(2, 4), [SELFPRESERVING]),
+    'scenario2/variant4': (character(2, 5), [AGGRESSIVE]),
+    'scenario2/variant5': (character(2, 5), [STUPID_TOP, AGGRESSIVE]),
+}
+
+def create(spec):
+    '''
+    Creates an entity from its specification
+
+            Parameters:
+                    spec (module, class, arguments): The entity specification
+
+            Returns:
+                    entity (entity): The new entity
+    '''
+    (module, cls, args) = spec
+    return getattr(importlib.import_module(module), cls)(*args)
+
+def init_worker():
+    '''
+    Silences the characters' debugging output in a pool process
+    '''
+    sys.stdout = open(os.devnull, "w")
+
+def play_game(task):
+    '''
+    Plays one game of a variant
+
+            Parameters:
+                    task (variant, seed): The variant name and the random seed
+
+            Returns:
+                    result (dict): The variant, seed, outcome of the character, score, number of steps and wall time
+    '''
+    (variant, seed) = task
+    (char, monsters) = VARIANTS[variant]
+    random.seed(seed)
+    g = Engine.fromfile(os.path.join(GROUP06, os.path.dirname(variant), 'map.txt'))
+    for m in monsters:
+        g.add_monster(create(m))
+    g.add_character(create(char))
+    start = time.perf_counter()
+    try:
+        r = g.run()
+        (outcome, score, steps) = (r.outcome["me"], r.scores["me"], r.steps)
+    except Exception as e:
+        # A crash of the character code counts as a loss
+        (outcome, score, steps) = ("error: " + repr(e), None, 0)
+    elapsed = time.perf_counter() - start
+    return {"variant": variant, "seed": seed, "outcome": outcome,
+            "score": score, "steps": steps, "time": elapsed}
+
+def read_results(path):
+    '''
+    Reads the games saved so far
+
+            Parameters:
+                    path (string): The results file
+
+            Returns:
+                    results (list(dict)): The games, as returned by play_game
+    '''
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                # A crash can leave the last line incomplete
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    pass
+    return results
+
+def summarize(results):
+    '''
+    Aggregates the games of each variant
+
+            Parameters:
+                    results (list(dict)): The games, as returned by play_game
+
+            Returns:
+                    summary (dict): variant -> games, win rate, score mean, standard deviation and quartiles, and mean time per step
+    '''
+    by_variant = {}
+    for r in results:
+        by_variant.setdefault(r["variant"], []).append(r)
+    summary = {}
+    for variant, games in sorted(by_variant.items()):
+        scores = [g["score"] for g in games if g["score"] is not None]
+        steps = sum(g["steps"] for g in games)
+        s = {"games": len(games),
+             "win_rate": sum(1 for g in games if g["outcome"] == "exit") / len(games),
+             "errors": sum(1 for g in games if g["outcome"].startswith("error")),
+             "time_per_step": sum(g["time"] for g in games) / steps if steps else 0.0}
+        if scores:
+            s["score_mean"] = statistics.mean(scores)
+            s["score_stdev"] = statistics.pstdev(scores)
+            if len(scores) > 1:
+                s["score_quartiles"] = statistics.quantiles(scores, n=4)
+            else:
+                s["score_quartiles"] = [scores[0]] * 3
+        summary[variant] = s
+    return summary
+
+def evaluate(path, games, workers=None, variants=None):
+    '''
+    Plays the missing games of each variant and appends them to the results file
+
+            Parameters:
+                    path (string): The results file
+                    games (int): The number of games per variant, seeded 0 to games-1
+                    workers (int): The number of processes, None for one per core
+                    variants (list(string)): The variants to play, None for all
+
+            Returns:
+                    summary (dict): The summary of all the games in the file, as returned by summarize
+    '''
+    if variants is None:
+        variants = sorted(VARIANTS)
+    results = read_results(path)
+    done = set((r["variant"], r["seed"]) for r in results)
+    tasks = [(v, s) for v in variants for s in range(games) if (v, s) not in done]
+    print(len(done), "games already played,", len(tasks), "to go")
+    with open(path, "a") as log, multiprocessing.Pool(workers, init_worker) as pool:
+        for r in pool.imap_unordered(play_game, tasks):
+            results.append(r)
+            log.write(json.dumps(r) + "\n")
+            log.flush()
+    return summarize(results)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage:\n  {} <results file> <games per variant> [workers] [variant ...]".format(sys.argv[0]))
+        sys.exit(1)
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    variants = sys.argv[4:] or None
+    summary = evaluate(sys.argv[1], int(sys.argv[2]), workers, variants)
+    print("variant             games  win%  errors  score mean (sd)     quartiles             ms/step")
+    for variant, s in summary.items():
+        q = " ".join("{:.0f}".format(v) for v in s.get("score_quartiles", []))
+        print("{:<19} {:>5} {:>5.1f} {:>7}  {:>9.1f} ({:>7.1f})  {:<21} {:>7.2f}".format(
+            variant, s["games"], 100 * s["win_rate"], s["errors"],
+            s.get("score_mean", 0), s.get("score_stdev", 0), q, 1000 * s["time_per_step"]))
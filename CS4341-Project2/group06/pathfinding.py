@@ -0,0 +1,68 @@
+import heapq
+
+def chebyshev_distance(a, b):
+    '''
+    Returns the number of 8-moves between two cells on an empty grid
+
+            Parameters:
+                    a (x, y): The first cell
+                    b (x, y): The second cell
+
+            Returns:
+                    distance (number): max(|dx|, |dy|)
+    '''
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+def a_star(start, goal, neighbors, cost=None, heuristic=chebyshev_distance):
+    '''
+    Finds a cheapest path with A*
+
+    The frontier is a binary heap ordered by f = g + h; ties go to the cell
+    closest to the goal (lowest h), then to the cell pushed first. Expanded
+    cells are closed, and the search stops as soon as the goal is popped.
+    With step costs of at least 1, the default heuristic never overestimates,
+    so the path returned is a cheapest one.
+
+            Parameters:
+                    start (x, y): The start cell
+                    goal (x, y): The goal cell
+                    neighbors (function): Maps a cell to the list of cells reachable from it
+                    cost (function): Maps a cell to the cost of stepping into it, None for a cost of 1
+                    heuristic (function): Estimates the cost between two cells
+
+            Returns:
+                    path (list((x, y))): The cells from start (excluded) to goal (included), [] if the goal can't be reached
+    '''
+    h = heuristic(start, goal)
+    frontier = [(h, h, 0, start)]
+    pushed = 1
+    came_from = {start: None}
+    cost_so_far = {start: 0}
+    closed = set()
+    while frontier:
+        current = heapq.heappop(frontier)[3]
+        if current in closed:
+            # Stale entry, the cell was reached more cheaply since
+            continue
+        if current == goal:
+            path = []
+            while current != start:
+                path.append(current)
+                current = came_from[current]
+            return path[::-1]
+        closed.add(current)
+        g = cost_so_far[current]
+        for nxt in neighbors(current):
+            if nxt in closed:
+                continue
+            if cost is None:
+                new_cost = g + 1
+            else:
+                new_cost = g + cost(nxt)
+            if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                cost_so_far[nxt] = new_cost
+                came_from[nxt] = current
+                h = heuristic(nxt, goal)
+                heapq.heappush(frontier, (new_cost + h, h, pushed, nxt))
+                pushed = pushed + 1
+    return []
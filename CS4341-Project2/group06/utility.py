@@ -1,12 +1,12 @@
 import sys
 import math
-from queue import PriorityQueue
 
 sys.path.insert(0, '../bomberman')
 from events import Event
 from sensed_world import SensedWorld
 
 import random
+import pathfinding
 
 class Util:
 
@@ -136,48 +136,30 @@ class Util:
                 Returns:
                         path (list((x, y)): A list of (x, y) coordinates from start to finish according to the A* algorithm
         '''
-        frontier = PriorityQueue()
-        frontier.put((initialX, initialY), 0)
-        came_from = {}
-        cost_so_far = {}
-        came_from[(initialX, initialY)] = None
-        cost_so_far[(initialX, initialY)] = 0
-
-        while not frontier.empty():
-            current = frontier.get()
-            if current == (endX, endY):
-                path = []
-                while current != (initialX, initialY):
-                    path.append(current)
-                    current = came_from[current]
-                return path[::-1]
-
-            for next in self.get_neighbors(current[0], current[1], wrld):
-                new_cost = 0
-                if (cost):
-                    new_cost = cost_so_far[current] + self.cost(next, wrld)
-                else:
-                    new_cost = cost_so_far[current] + 1
-                if next not in cost_so_far or new_cost < cost_so_far[next]:
-                    cost_so_far[next] = new_cost
-                    priority = new_cost + self.euclidean_distance(next[0], next[1], endX, endY)
-                    frontier.put(next, priority)
-                    came_from[next] = current
-        return []
+        step_cost = None
+        if (cost):
+            # Step the world once for the whole search rather than once per cell
+            next_world = SensedWorld.from_world(wrld).next()
+            step_cost = lambda next: self.cost(next, wrld, next_world)
+        return pathfinding.a_star((initialX, initialY), (endX, endY),
+                                  lambda cell: self.get_neighbors(cell[0], cell[1], wrld),
+                                  step_cost)
 
     @classmethod
-    def cost(self, next, wrld):
+    def cost(self, next, wrld, next_world=None):
         '''
         Finds cost of the next move depending on certain conditions (walls, monsters, etc)
 
                 Parameters:
                         next (x, y): The coordinate to check the cost for
                         wrld (world): The world
+                        next_world (world, events): The result of wrld.next(), computed if None
 
                 Returns:
                         cost (number): The cost of this square
         '''
-        next_world = SensedWorld.from_world(wrld).next()
+        if next_world is None:
+            next_world = SensedWorld.from_world(wrld).next()
         if wrld.wall_at(next[0], next[1]):
             return 100
         elif (next_world[0].explosion_at(next[0], next[1]) or wrld.explosion_at(next[0], next[1])) or wrld.monsters_at(next[0], next[1]) or wrld.bomb_at(next[0], next[1]):